@@ -13,6 +13,7 @@ class BotConfig(BaseModel):
     max_positions: int = Field(..., gt=0)
     min_24h_volume: Decimal = Field(..., gt=0)
     daily_loss_limit: Decimal = Field(..., ge=0, le=100)
+    max_slippage_percent: Decimal = Field(default=Decimal("0.5"), gt=0, description="Max expected slippage for market buys")
     sleep_interval: int = Field(..., gt=0)
     blacklist: List[str] = Field(default_factory=list)
     dry_run: bool = Field(default=True)
@@ -1,44 +1,112 @@
 import structlog
 import aiosqlite
 import os
-from decimal import Decimal
+from bot.utils.fixed_point import FixedPoint, decimals_for
 
 logger = structlog.get_logger(__name__)
 DATABASE_FILE = os.getenv("DATABASE_FILE", "bot/database/trades.db")
 
+# מחירים וכמויות נשמרים כשלמים (נקודה קבועה) לפי מספר הספרות של כל סימבול
+_CREATE_TRADES = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        status TEXT NOT NULL,
+        avg_price INTEGER NOT NULL,
+        base_qty INTEGER NOT NULL,
+        price_decimals INTEGER NOT NULL DEFAULT 0,
+        qty_decimals INTEGER NOT NULL DEFAULT 0,
+        dca_count INTEGER NOT NULL,
+        tp_order_id TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
 async def create_tables():
     async with aiosqlite.connect(DATABASE_FILE) as db:
+        await db.execute(_CREATE_TRADES.format(table="trades"))
+        await _migrate_text_amounts(db)
+        # יומן אירועים append-only: כל מילוי (פתיחה/DCA/סגירה) כשורה נפרדת
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS trades (
+            CREATE TABLE IF NOT EXISTS trade_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trade_id INTEGER NOT NULL,
                 symbol TEXT NOT NULL,
-                status TEXT NOT NULL, 
-                avg_price TEXT NOT NULL, 
-                base_qty TEXT NOT NULL,
-                dca_count INTEGER NOT NULL,
-                tp_order_id TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                event_type TEXT NOT NULL,
+                price INTEGER NOT NULL,
+                price_decimals INTEGER NOT NULL,
+                qty INTEGER NOT NULL,
+                qty_decimals INTEGER NOT NULL,
+                quote_qty INTEGER NOT NULL,
+                fee INTEGER NOT NULL DEFAULT 0,
+                fee_asset TEXT,
+                ts INTEGER NOT NULL
             )
         """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_trades_status ON trades (status)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol, status)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_events_trade ON trade_events (trade_id, event_type)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_events_symbol_ts ON trade_events (symbol, ts)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_events_type_ts ON trade_events (event_type, ts)")
         await db.commit()
 
+async def _migrate_text_amounts(db):
+    """
+    המרת DB ישן (avg_price/base_qty כ-TEXT עשרוני) לעמודות INTEGER: SQLite לא משנה טיפוס עמודה,
+    לכן הטבלה נבנית מחדש (trades_new), הנתונים מועתקים מומרים והטבלה הישנה מוחלפת.
+    """
+    async with db.execute("PRAGMA table_info(trades)") as cursor:
+        columns = {r[1]: r[2].upper() for r in await cursor.fetchall()}
+    if columns["avg_price"] == "INTEGER":
+        return
+
+    logger.info("migrating_trades_to_fixed_point")
+    # DB שכבר קיבל עמודות decimals מחזיק יחידות שלמות כטקסט - רק משנים טיפוס
+    has_decimals = "price_decimals" in columns
+    select = ("SELECT id, symbol, status, avg_price, base_qty, "
+              + ("price_decimals, qty_decimals, " if has_decimals else "0, 0, ")
+              + "dca_count, tp_order_id, created_at FROM trades")
+    async with db.execute(select) as cursor:
+        rows = await cursor.fetchall()
+    converted = []
+    for trade_id, symbol, status, avg_price, base_qty, price_dec, qty_dec, dca_count, tp_id, created_at in rows:
+        if has_decimals:
+            price_units, qty_units = int(avg_price), int(base_qty)
+        else:
+            price_dec, qty_dec = decimals_for(avg_price), decimals_for(base_qty)
+            price_units = FixedPoint.from_str(avg_price, price_dec).units
+            qty_units = FixedPoint.from_str(base_qty, qty_dec).units
+        converted.append((trade_id, symbol, status, price_units, qty_units, price_dec, qty_dec,
+                          dca_count, tp_id, created_at))
+
+    await db.execute("DROP TABLE IF EXISTS trades_new")
+    await db.execute(_CREATE_TRADES.format(table="trades_new"))
+    await db.executemany(
+        "INSERT INTO trades_new (id, symbol, status, avg_price, base_qty, price_decimals, qty_decimals, "
+        "dca_count, tp_order_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        converted
+    )
+    await db.execute("DROP TABLE trades")
+    await db.execute("ALTER TABLE trades_new RENAME TO trades")
+
 class TradeRepository:
     @staticmethod
     async def create_pending_trade(symbol: str):
         async with aiosqlite.connect(DATABASE_FILE) as db:
             cursor = await db.execute(
-                "INSERT INTO trades (symbol, status, avg_price, base_qty, dca_count) VALUES (?, 'PENDING_BUY', '0', '0', 0)",
+                "INSERT INTO trades (symbol, status, avg_price, base_qty, dca_count) VALUES (?, 'PENDING_BUY', 0, 0, 0)",
                 (symbol,)
             )
             await db.commit()
             return cursor.lastrowid
 
     @staticmethod
-    async def confirm_trade(trade_id: int, price: Decimal, qty: Decimal, tp_id: str, dca_count: int = 0):
+    async def confirm_trade(trade_id: int, price: FixedPoint, qty: FixedPoint, tp_id: str, dca_count: int = 0):
         async with aiosqlite.connect(DATABASE_FILE) as db:
             await db.execute(
-                "UPDATE trades SET status = 'OPEN', avg_price = ?, base_qty = ?, tp_order_id = ?, dca_count = ? WHERE id = ?",
-                (str(price), str(qty), tp_id, dca_count, trade_id)
+                "UPDATE trades SET status = 'OPEN', avg_price = ?, base_qty = ?, price_decimals = ?, qty_decimals = ?, "
+                "tp_order_id = ?, dca_count = ? WHERE id = ?",
+                (price.units, qty.units, price.decimals, qty.decimals, tp_id, dca_count, trade_id)
             )
             await db.commit()
 
@@ -50,7 +118,8 @@ class TradeRepository:
                 rows = await cursor.fetchall()
                 return [{
                     "id": r["id"], "symbol": r["symbol"],
-                    "avg_price": Decimal(r["avg_price"]), "base_qty": Decimal(r["base_qty"]),
+                    "avg_price": FixedPoint(r["avg_price"], r["price_decimals"]),
+                    "base_qty": FixedPoint(r["base_qty"], r["qty_decimals"]),
                     "dca_count": r["dca_count"], "tp_order_id": r["tp_order_id"]
                 } for r in rows]
 
@@ -58,4 +127,4 @@ class TradeRepository:
     async def close_trade(trade_id: int, status: str):
         async with aiosqlite.connect(DATABASE_FILE) as db:
             await db.execute("UPDATE trades SET status = ? WHERE id = ?", (status, trade_id))
-            await db.commit()
\ No newline at end of file
+            await db.commit()
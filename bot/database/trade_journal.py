@@ -0,0 +1,195 @@
+import asyncio
+import time
+import structlog
+import aiosqlite
+from decimal import Decimal
+from typing import Optional, Tuple
+from bot.database import database_service
+from bot.utils.fixed_point import FixedPoint
+
+logger = structlog.get_logger(__name__)
+
+# שווי במטבע הציטוט (USDT) ועמלות נשמרים בסקאלה אחידה כדי ש-SUM ב-SQL יהיה מדויק
+QUOTE_DECIMALS = 8
+FEE_DECIMALS = 8
+
+EVENT_OPEN = "OPEN"
+EVENT_DCA = "DCA"
+EVENT_CLOSE = "CLOSE"
+
+_STOP = object()  # סימון סוף לתור - ה-writer יוצא אחרי שכתב את כל מה שלפניו
+
+_INSERT_EVENT = """
+    INSERT INTO trade_events (trade_id, symbol, event_type, price, price_decimals, qty, qty_decimals,
+                              quote_qty, fee, fee_asset, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def fill_from_order(order: Optional[dict], price: FixedPoint, qty: FixedPoint) -> Tuple[FixedPoint, FixedPoint, Optional[FixedPoint], Optional[str]]:
+    """סיכום מילוי מתשובת פקודת שוק (fills). ללא fills מחזיר את המחיר והכמות שהתבקשו."""
+    fills = (order or {}).get("fills") or []
+    if not fills:
+        return price, qty, None, None
+
+    qty_units, notional = 0, 0
+    fee = FixedPoint(0, FEE_DECIMALS)
+    fee_asset = fills[0].get("commissionAsset")
+    for f in fills:
+        f_qty = FixedPoint.from_str(f["qty"], qty.decimals).units
+        qty_units += f_qty
+        notional += FixedPoint.from_str(f["price"], price.decimals).units * f_qty
+        if f.get("commissionAsset") == fee_asset:
+            fee = fee + FixedPoint.from_str(f["commission"], FEE_DECIMALS)
+    if not qty_units:
+        return price, qty, None, None
+    avg = FixedPoint(notional // qty_units, price.decimals)
+    fill_qty = FixedPoint(qty_units, qty.decimals)
+    return avg, fill_qty, fee, fee_asset
+
+class TradeJournal:
+    """
+    יומן אירועים append-only לכל מילוי (פתיחה, DCA, סגירה).
+    record() לא חוסם: האירועים נכתבים ברקע בטרנזקציות מקובצות.
+    """
+
+    def __init__(self, batch_size: int = 200):
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    def record(self, trade_id: int, symbol: str, event_type: str, price: FixedPoint, qty: FixedPoint,
+               fee: Optional[FixedPoint] = None, fee_asset: Optional[str] = None, ts: Optional[float] = None):
+        quote = price.mul(qty, QUOTE_DECIMALS)
+        fee_units = fee.rescale(FEE_DECIMALS).units if fee is not None else 0
+        self._queue.put_nowait((
+            trade_id, symbol, event_type, price.units, price.decimals, qty.units, qty.decimals,
+            quote.units, fee_units, fee_asset, int((ts or time.time()) * 1000)
+        ))
+
+    def _drain(self, first) -> Tuple[list, bool]:
+        """אצווה של עד batch_size אירועים; הדגל מסמן שנתקלנו ב-_STOP."""
+        batch, stopping = [], False
+        item = first
+        while True:
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+            if len(batch) >= self.batch_size or self._queue.empty():
+                return batch, stopping
+            item = self._queue.get_nowait()
+
+    async def _write(self, db, batch: list):
+        try:
+            await db.executemany(_INSERT_EVENT, batch)
+            await db.commit()
+        except Exception as e:
+            logger.error("journal_write_error", events=len(batch), error=str(e))
+
+    async def _writer(self):
+        # החיבור נפתח רק עם האירוע הראשון ונשמר פתוח עד שמגיע _STOP
+        db = None
+        stopping = False
+        try:
+            while not stopping:
+                batch, stopping = self._drain(await self._queue.get())
+                if not batch:
+                    continue
+                if db is None:
+                    db = await aiosqlite.connect(database_service.DATABASE_FILE)
+                await self._write(db, batch)
+        finally:
+            if db is not None:
+                await db.close()
+
+    async def flush(self):
+        """כתיבה מיידית של כל האירועים שממתינים בתור."""
+        if self._queue.empty():
+            return
+        async with aiosqlite.connect(database_service.DATABASE_FILE) as db:
+            while not self._queue.empty():
+                batch, _ = self._drain(self._queue.get_nowait())
+                if batch:
+                    await self._write(db, batch)
+
+    async def stop(self):
+        """עצירה מסודרת: ה-writer מסיים את האצווה הנוכחית וכל מה שנרשם לפני העצירה."""
+        if self._task:
+            self._queue.put_nowait(_STOP)
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+class TradeAnalytics:
+    """שאילתות ניתוח על יומן האירועים. כל האגרגציה מתבצעת ב-SQL."""
+
+    @staticmethod
+    def _quote(units) -> Decimal:
+        return FixedPoint(units or 0, QUOTE_DECIMALS).to_decimal()
+
+    @staticmethod
+    async def symbol_pnl(since: Optional[float] = None):
+        """
+        רווח/הפסד ממומש לכל סימבול, בניכוי עמלות ב-USDT. נכללות רק עסקאות סגורות שגם
+        הפתיחה שלהן ביומן - עסקאות שנפתחו לפני היומן היו נספרות כולן כרווח.
+        """
+        async with aiosqlite.connect(database_service.DATABASE_FILE) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("""
+                SELECT e.symbol,
+                       COUNT(DISTINCT e.trade_id) AS trades,
+                       SUM(CASE WHEN e.event_type = 'CLOSE' THEN e.quote_qty ELSE 0 END) AS sold,
+                       SUM(CASE WHEN e.event_type != 'CLOSE' THEN e.quote_qty ELSE 0 END) AS bought,
+                       SUM(CASE WHEN e.fee_asset = 'USDT' THEN e.fee ELSE 0 END) AS fees
+                FROM trade_events e
+                WHERE e.trade_id IN (SELECT trade_id FROM trade_events
+                                     WHERE event_type = 'CLOSE' AND ts >= ?)
+                  AND e.trade_id IN (SELECT trade_id FROM trade_events WHERE event_type = 'OPEN')
+                GROUP BY e.symbol
+                ORDER BY (sold - bought - fees) DESC
+            """, (int((since or 0) * 1000),)) as cursor:
+                rows = await cursor.fetchall()
+        return [{
+            "symbol": r["symbol"], "trades": r["trades"],
+            "bought": TradeAnalytics._quote(r["bought"]), "sold": TradeAnalytics._quote(r["sold"]),
+            "fees": FixedPoint(r["fees"] or 0, FEE_DECIMALS).to_decimal(),
+            "pnl": TradeAnalytics._quote(r["sold"] - r["bought"] - (r["fees"] or 0)),
+        } for r in rows]
+
+    @staticmethod
+    async def dca_depth_stats():
+        """התפלגות עומק DCA לפי סטטוס עסקה."""
+        async with aiosqlite.connect(database_service.DATABASE_FILE) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("""
+                SELECT status, dca_count, COUNT(*) AS trades
+                FROM trades
+                WHERE status IN ('OPEN', 'CLOSED_PROFIT')
+                GROUP BY status, dca_count
+                ORDER BY status, dca_count
+            """) as cursor:
+                return [dict(r) for r in await cursor.fetchall()]
+
+    @staticmethod
+    async def holding_times():
+        """זמני החזקה (שניות) לכל סימבול: ממוצע, מינימום ומקסימום מפתיחה עד סגירה."""
+        async with aiosqlite.connect(database_service.DATABASE_FILE) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("""
+                SELECT symbol, COUNT(*) AS trades,
+                       AVG(closed - opened) / 1000.0 AS avg_seconds,
+                       MIN(closed - opened) / 1000.0 AS min_seconds,
+                       MAX(closed - opened) / 1000.0 AS max_seconds
+                FROM (SELECT trade_id, symbol,
+                             MIN(CASE WHEN event_type = 'OPEN' THEN ts END) AS opened,
+                             MAX(CASE WHEN event_type = 'CLOSE' THEN ts END) AS closed
+                      FROM trade_events
+                      GROUP BY trade_id)
+                WHERE opened IS NOT NULL AND closed IS NOT NULL
+                GROUP BY symbol
+                ORDER BY avg_seconds DESC
+            """) as cursor:
+                return [dict(r) for r in await cursor.fetchall()]
@@ -0,0 +1,202 @@
+import asyncio
+import bisect
+import time
+from collections import deque
+import structlog
+from binance import BinanceSocketManager
+from typing import Dict, Iterable, List, Optional
+
+logger = structlog.get_logger(__name__)
+
+SNAPSHOT_LIMIT = 1000
+SNAPSHOT_BACKOFF = 1.0
+SNAPSHOT_MAX_BACKOFF = 60.0
+MAX_BUFFERED_EVENTS = 1000
+BOOK_WAIT_TIMEOUT = 3.0
+BOOK_POLL_INTERVAL = 0.05
+
+class OrderBook:
+    """ספר פקודות מקומי לסימבול אחד, מתוחזק מ-diff stream לפי נוהל הסנכרון של Binance."""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.last_update_id = 0
+        self.synced = False
+        self._asks: Dict[float, float] = {}
+        self._bids: Dict[float, float] = {}
+        self._ask_prices: List[float] = []  # ממוין עולה
+        self._bid_prices: List[float] = []  # ממוין עולה (המחיר הטוב ביותר בסוף)
+
+    def load_snapshot(self, snapshot: dict):
+        self._asks = {float(p): float(q) for p, q, *_ in snapshot["asks"] if float(q) > 0}
+        self._bids = {float(p): float(q) for p, q, *_ in snapshot["bids"] if float(q) > 0}
+        self._ask_prices = sorted(self._asks)
+        self._bid_prices = sorted(self._bids)
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.synced = True
+
+    def reset(self):
+        self.synced = False
+        self.last_update_id = 0
+
+    def apply_diff(self, event: dict) -> bool:
+        """מחיל עדכון depthUpdate. מחזיר False אם זוהה פער ברצף ונדרש snapshot חדש."""
+        if event["u"] <= self.last_update_id:
+            return True  # עדכון ישן שכבר כלול ב-snapshot
+        if not event["U"] <= self.last_update_id + 1 <= event["u"]:
+            self.reset()
+            return False
+        for p, q, *_ in event["a"]:
+            self._set_level(self._asks, self._ask_prices, float(p), float(q))
+        for p, q, *_ in event["b"]:
+            self._set_level(self._bids, self._bid_prices, float(p), float(q))
+        self.last_update_id = event["u"]
+        return True
+
+    @staticmethod
+    def _set_level(levels: Dict[float, float], prices: List[float], price: float, qty: float):
+        if qty == 0:
+            if levels.pop(price, None) is not None:
+                del prices[bisect.bisect_left(prices, price)]
+        else:
+            if price not in levels:
+                bisect.insort(prices, price)
+            levels[price] = qty
+
+    def best_ask(self) -> Optional[float]:
+        return self._ask_prices[0] if self._ask_prices else None
+
+    def best_bid(self) -> Optional[float]:
+        return self._bid_prices[-1] if self._bid_prices else None
+
+    def max_buy_qty(self, max_slippage_percent: float) -> float:
+        """הכמות הגדולה ביותר שמחיר המילוי הממוצע שלה נשאר בתוך הסליפג' המותר."""
+        best = self.best_ask()
+        if best is None:
+            return 0.0
+        limit = best * (1 + max_slippage_percent / 100)
+        qty, cost = 0.0, 0.0
+        for price in self._ask_prices:
+            level_qty = self._asks[price]
+            if (cost + level_qty * price) / (qty + level_qty) > limit:
+                # מילוי חלקי של הרמה עד שהממוצע נוגע בגבול
+                qty += (limit * qty - cost) / (price - limit)
+                break
+            qty += level_qty
+            cost += level_qty * price
+        return qty
+
+class OrderBookManager:
+    """
+    מנהל ספרי פקודות מקומיים רק לסימבולים במעקב (עסקאות פתוחות ומועמדים מובילים).
+    snapshot נטען פעם אחת בחיבור (ובפער ברצף); משם הספר מתעדכן מה-stream בלבד.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.bsm = BinanceSocketManager(client)
+        self.books: Dict[str, OrderBook] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def get_book(self, symbol: str) -> Optional[OrderBook]:
+        book = self.books.get(symbol)
+        return book if book and book.synced else None
+
+    async def sync(self, symbols: Iterable[str]):
+        """מעקב אחרי הסימבולים הנתונים בלבד: פתיחת streams חדשים וסגירת מיותרים."""
+        wanted = set(symbols)
+        for symbol in [s for s in self._tasks if s not in wanted]:
+            await self.untrack(symbol)
+        for symbol in wanted:
+            self._ensure_tracked(symbol)
+
+    def _ensure_tracked(self, symbol: str):
+        task = self._tasks.get(symbol)
+        if task is None or task.done():
+            self.track(symbol)
+
+    async def wait_for_book(self, symbol: str, timeout: float = BOOK_WAIT_TIMEOUT) -> Optional[OrderBook]:
+        """פתיחת מעקב לפי הצורך והמתנה של עד timeout שניות לספר מסונכרן. None אם לא הספיק."""
+        self._ensure_tracked(symbol)
+        deadline = time.monotonic() + timeout
+        book = self.get_book(symbol)
+        while book is None and time.monotonic() < deadline:
+            await asyncio.sleep(BOOK_POLL_INTERVAL)
+            book = self.get_book(symbol)
+        return book
+
+    def track(self, symbol: str):
+        logger.info("order_book_track", symbol=symbol)
+        self.books[symbol] = OrderBook(symbol)
+        socket = self.bsm.depth_socket(symbol, interval=100)
+        self._tasks[symbol] = asyncio.create_task(self._listen(self.books[symbol], socket))
+
+    async def untrack(self, symbol: str):
+        task = self._tasks.pop(symbol, None)
+        self.books.pop(symbol, None)
+        if task:
+            task.cancel()
+
+    async def _listen(self, book: OrderBook, socket):
+        buffer = deque(maxlen=MAX_BUFFERED_EVENTS)
+        failures = 0
+        snapshot_task = asyncio.create_task(self._fetch_snapshot(book.symbol))
+        try:
+            async with socket as s:
+                while True:
+                    res = await s.recv()
+                    data = res['data'] if 'data' in res else res
+                    if data.get('e') != 'depthUpdate':
+                        continue
+
+                    if book.synced:
+                        if book.apply_diff(data):
+                            continue
+                        logger.warning("order_book_gap", symbol=book.symbol)
+                        snapshot_task = asyncio.create_task(self._fetch_snapshot(book.symbol))
+
+                    # עד שה-snapshot מגיע שומרים את העדכונים בצד
+                    buffer.append(data)
+                    if not snapshot_task.done():
+                        continue
+                    snapshot = snapshot_task.result()
+                    if snapshot is None:
+                        # כשל REST (למשל 429): backoff מעריכי במקום בקשה על כל עדכון
+                        failures += 1
+                        delay = min(SNAPSHOT_MAX_BACKOFF, SNAPSHOT_BACKOFF * 2 ** (failures - 1))
+                        snapshot_task = asyncio.create_task(self._fetch_snapshot(book.symbol, delay))
+                        continue
+                    failures = 0
+                    if snapshot["lastUpdateId"] + 1 < buffer[0]["U"]:
+                        snapshot_task = asyncio.create_task(self._fetch_snapshot(book.symbol))
+                        continue
+                    book.load_snapshot(snapshot)
+                    for event in buffer:
+                        if not book.apply_diff(event):
+                            snapshot_task = asyncio.create_task(self._fetch_snapshot(book.symbol))
+                            break
+                    buffer.clear()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("order_book_listen_error", symbol=book.symbol, error=str(e))
+        finally:
+            snapshot_task.cancel()
+            # ספר שה-stream שלו נפל לא משמש לתמחור; sync() הבא יפתח stream חדש
+            book.reset()
+            if self._tasks.get(book.symbol) is asyncio.current_task():
+                del self._tasks[book.symbol]
+                self.books.pop(book.symbol, None)
+
+    async def _fetch_snapshot(self, symbol: str, delay: float = 0.0) -> Optional[dict]:
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            return await self.client.get_order_book(symbol=symbol, limit=SNAPSHOT_LIMIT)
+        except Exception as e:
+            logger.error("order_book_snapshot_error", symbol=symbol, error=str(e))
+            return None
+
+    async def stop(self):
+        for symbol in list(self._tasks):
+            await self.untrack(symbol)
@@ -14,6 +14,7 @@ class PriceCache:
         self.prices = {}
         self.last_update = None
         self._socket_task = None
+        self._listeners = []
         # Allow forcing healthy state via env var for local/testing runs
         self.force_healthy = os.getenv("FORCE_PRICE_CACHE_HEALTHY", "0").lower() not in ("0", "false", "no")
 
@@ -39,14 +40,26 @@ class PriceCache:
                     
                     if isinstance(data, list):
                         for ticker in data:
-                            self.prices[ticker['s']] = Decimal(str(ticker['c']))
+                            self._handle_ticker(ticker)
                     elif isinstance(data, dict) and data.get('e') == '24hrTicker':
-                        self.prices[data['s']] = Decimal(str(data['c']))
+                        self._handle_ticker(data)
         except asyncio.CancelledError:
             pass
         except Exception as e:
             logger.error("websocket_listen_error", error=str(e))
 
+    def _handle_ticker(self, ticker: dict):
+        self.prices[ticker['s']] = Decimal(str(ticker['c']))
+        for listener in self._listeners:
+            try:
+                listener(ticker)
+            except Exception as e:
+                logger.error("price_listener_error", symbol=ticker.get('s'), error=str(e))
+
+    def add_listener(self, callback):
+        """רישום callback שמקבל כל עדכון ticker גולמי (dict) מה-stream."""
+        self._listeners.append(callback)
+
     def is_healthy(self, max_age_seconds=30) -> bool:
         """בדיקת דופק - האם קיבלנו עדכון מחיר לאחרונה"""
         if self.force_healthy:
@@ -0,0 +1,132 @@
+import heapq
+import math
+import time
+import structlog
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = structlog.get_logger(__name__)
+
+# משקלות לדירוג הזדמנויות (באחוזים, חוץ מנפח שנמדד בסדרי גודל)
+SMA_DEPTH_WEIGHT = 1.0
+DIP_WEIGHT = 1.0
+VOLUME_WEIGHT = 0.5
+SPREAD_WEIGHT = 5.0
+
+class _Reference:
+    __slots__ = ("sma", "open_price", "expires_at")
+
+    def __init__(self, sma: float, open_price: float, expires_at: float):
+        self.sma = sma
+        self.open_price = open_price
+        self.expires_at = expires_at
+
+class CandidateIndex:
+    """
+    אינדקס מועמדים לכניסה: מדרג סימבולים שעומדים בתנאי הכניסה ושומר אותם ב-heap
+    שמתעדכן בכל שינוי מחיר, כך שהמנוע שולף את N הטובים ביותר ב-O(log n).
+    """
+
+    def __init__(self, dip_threshold: Decimal):
+        self.dip_threshold = float(dip_threshold)
+        self._refs: Dict[str, _Reference] = {}
+        self._market: Dict[str, Tuple[float, float]] = {}  # symbol -> (quote_volume, spread%)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._live: Dict[str, Tuple[int, float]] = {}  # symbol -> (seq, score) של הרשומה העדכנית
+        self._seq = 0
+
+    def needs_reference(self, symbol: str, now: Optional[float] = None) -> bool:
+        ref = self._refs.get(symbol)
+        return ref is None or (now or time.time()) >= ref.expires_at
+
+    def set_reference(self, symbol: str, sma: Decimal, open_price: Decimal, expires_at: float):
+        """ערכי ייחוס לנר הנוכחי: SMA ומחיר פתיחה. תקפים עד סגירת הנר."""
+        self._refs[symbol] = _Reference(float(sma), float(open_price), expires_at)
+
+    def update(self, symbol: str, price: float, quote_volume: Optional[float] = None,
+               bid: Optional[float] = None, ask: Optional[float] = None):
+        """עדכון מחיר: חישוב ציון מחדש ודחיפה ל-heap אם הסימבול עומד בתנאים."""
+        if quote_volume is not None or (bid and ask):
+            prev_volume, prev_spread = self._market.get(symbol, (0.0, 0.0))
+            spread = (ask - bid) / ask * 100 if bid and ask else prev_spread
+            self._market[symbol] = (quote_volume if quote_volume is not None else prev_volume, spread)
+
+        ref = self._refs.get(symbol)
+        if ref is None:
+            return
+        score = self._score(symbol, ref, price)
+        if score is None:
+            self._live.pop(symbol, None)
+            return
+
+        live = self._live.get(symbol)
+        if live is not None and live[1] == score:
+            return
+        self._seq += 1
+        self._live[symbol] = (self._seq, score)
+        heapq.heappush(self._heap, (-score, self._seq, symbol))
+        if len(self._heap) > 4 * len(self._live) + 64:
+            self._compact()
+
+    def on_ticker(self, ticker: dict):
+        """Listener ל-PriceCache: מעדכן רק סימבולים שיש להם ערכי ייחוס."""
+        symbol = ticker['s']
+        if symbol not in self._refs:
+            return
+        self.update(symbol, float(ticker['c']),
+                    quote_volume=float(ticker['q']) if 'q' in ticker else None,
+                    bid=float(ticker['b']) if 'b' in ticker else None,
+                    ask=float(ticker['a']) if 'a' in ticker else None)
+
+    def _score(self, symbol: str, ref: _Reference, price: float) -> Optional[float]:
+        if ref.open_price <= 0 or ref.sma <= 0 or time.time() >= ref.expires_at:
+            return None
+        change = (price - ref.open_price) / ref.open_price * 100
+        if change > self.dip_threshold or price >= ref.sma:
+            return None
+
+        depth = (ref.sma - price) / ref.sma * 100
+        quote_volume, spread = self._market.get(symbol, (0.0, 0.0))
+        return (SMA_DEPTH_WEIGHT * depth
+                + DIP_WEIGHT * -change
+                + VOLUME_WEIGHT * math.log10(quote_volume + 1)
+                - SPREAD_WEIGHT * spread)
+
+    def _compact(self):
+        self._heap = [(-score, seq, symbol) for symbol, (seq, score) in self._live.items()]
+        heapq.heapify(self._heap)
+
+    def discard(self, symbol: str):
+        self._live.pop(symbol, None)
+
+    def retain(self, symbols: Iterable[str]):
+        """השארת סימבולים שעברו את סינון הנפח בלבד."""
+        keep = set(symbols)
+        for symbol in [s for s in self._refs if s not in keep]:
+            del self._refs[symbol]
+            self._market.pop(symbol, None)
+            self._live.pop(symbol, None)
+
+    def pop_best(self, n: int, exclude: Iterable[str] = ()) -> List[str]:
+        """שליפת N המועמדים עם הציון הגבוה ביותר (מדלג על רשומות שהתיישנו)."""
+        excluded = set(exclude)
+        now = time.time()
+        best = []
+        while self._heap and len(best) < n:
+            _, seq, symbol = heapq.heappop(self._heap)
+            live = self._live.get(symbol)
+            if live is None or live[0] != seq:
+                continue
+            del self._live[symbol]
+            if symbol in excluded or now >= self._refs[symbol].expires_at:
+                continue
+            best.append(symbol)
+        return best
+
+    def peek_best(self, n: int) -> List[str]:
+        """N המועמדים המובילים ללא הוצאתם מהאינדקס."""
+        ranked = heapq.nsmallest(n, ((-score, symbol) for symbol, (_, score) in self._live.items()))
+        return [symbol for _, symbol in ranked]
+
+    def __len__(self) -> int:
+        return len(self._live)
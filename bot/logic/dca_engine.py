@@ -1,16 +1,18 @@
 import structlog
 from decimal import Decimal
+from bot.utils.fixed_point import FixedPoint, to_decimal
 
 logger = structlog.get_logger(__name__)
 
-async def check_dca_conditions(client, symbol: str, config: dict, current_avg_price: Decimal) -> bool:
+async def check_dca_conditions(client, symbol: str, config: dict, current_avg_price: FixedPoint) -> bool:
     try:
         ticker = await client.get_ticker(symbol=symbol)
-        current_price = Decimal(str(ticker["lastPrice"]))
+        current_price = Decimal(ticker["lastPrice"])
+        current_avg_price = to_decimal(current_avg_price)
 
         # חישוב אחוז ירידה בצורה מדויקת
         price_drop = ((current_avg_price - current_price) / current_avg_price) * 100
-        dca_trigger = Decimal(str(config["dca_trigger"]))
+        dca_trigger = to_decimal(config["dca_trigger"])
 
         if price_drop >= dca_trigger:
             logger.info("dca_triggered", symbol=symbol, drop=f"{price_drop:.2f}%")
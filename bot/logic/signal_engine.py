@@ -3,6 +3,7 @@ from binance import AsyncClient
 from datetime import datetime, timezone
 from typing import Optional, Dict, Tuple
 from decimal import Decimal
+from bot.utils.fixed_point import to_decimal
 
 logger = structlog.get_logger(__name__)
 
@@ -25,7 +26,7 @@ async def get_sma(client: AsyncClient, symbol: str, config: dict) -> Optional[De
         if len(klines) < int(config["sma_length"]):
             return None
 
-        closes = [Decimal(str(k[4])) for k in klines[:-1]]
+        closes = [Decimal(k[4]) for k in klines[:-1]]
         sma = sum(closes) / len(closes)
         
         sma_cache[cache_key] = (sma, now)
@@ -34,6 +35,18 @@ async def get_sma(client: AsyncClient, symbol: str, config: dict) -> Optional[De
         logger.error("sma_calc_error", symbol=symbol, error=str(e))
         return None
 
+async def get_entry_reference(client: AsyncClient, symbol: str, config: dict) -> Optional[Tuple[Decimal, Decimal, float]]:
+    """ערכי ייחוס לנר הנוכחי: (SMA, מחיר פתיחה, זמן סגירת הנר בשניות)."""
+    try:
+        sma = await get_sma(client, symbol, config)
+        klines = await client.get_historical_klines(symbol, config["timeframe"], limit=1)
+        if not sma or not klines:
+            return None
+        return sma, Decimal(klines[0][1]), int(klines[0][6]) / 1000
+    except Exception as e:
+        logger.error("entry_reference_error", symbol=symbol, error=str(e))
+        return None
+
 async def check_entry_conditions(client: AsyncClient, symbol: str, config: dict) -> bool:
     """בדיקת תנאי כניסה: ירידה (Dip) ומחיר מתחת ל-SMA."""
     try:
@@ -43,13 +56,13 @@ async def check_entry_conditions(client: AsyncClient, symbol: str, config: dict)
         if not sma or not klines:
             return False
 
-        curr_price = Decimal(str(klines[0][4]))
-        open_price = Decimal(str(klines[0][1]))
+        curr_price = Decimal(klines[0][4])
+        open_price = Decimal(klines[0][1])
         
         if open_price == 0: return False
         
         change = (curr_price - open_price) / open_price * 100
-        dip_threshold = Decimal(str(config["dip_threshold"]))
+        dip_threshold = to_decimal(config["dip_threshold"])
 
         meets = change <= dip_threshold and curr_price < sma
         return meets
@@ -1,6 +1,8 @@
 import structlog
 from decimal import Decimal, ROUND_FLOOR
 from bot.database.database_service import TradeRepository
+from bot.database.trade_journal import EVENT_OPEN, EVENT_DCA, fill_from_order
+from bot.utils.fixed_point import FixedPoint, AVG_PRICE_EXTRA_DECIMALS, decimals_for, weighted_avg_price, to_decimal
 
 logger = structlog.get_logger(__name__)
 
@@ -24,47 +26,72 @@ async def get_total_balance(client, config: dict, open_trades: list) -> Decimal:
             for trade in open_trades:
                 symbol = trade["symbol"]
                 price = ticker_dict.get(symbol, Decimal('0'))
-                total_nlv += Decimal(str(trade["base_qty"])) * price
+                total_nlv += to_decimal(trade["base_qty"]) * price
         return total_nlv
     except Exception as e:
         logger.error("balance_calc_error", error=str(e))
         return Decimal('0')
 
 class TradeManager:
-    def __init__(self, client, config: dict):
+    def __init__(self, client, config: dict, order_books=None, journal=None):
         self.client = client
         self.config = config
+        self.order_books = order_books
+        self.journal = journal
+
+    def _journal_fill(self, trade_id: int, symbol: str, event_type: str, order, price: FixedPoint, qty: FixedPoint):
+        if self.journal:
+            fill_price, fill_qty, fee, fee_asset = fill_from_order(order, price, qty)
+            self.journal.record(trade_id, symbol, event_type, fill_price, fill_qty, fee, fee_asset)
 
     async def _get_precision_tools(self, symbol: str):
         s_info = await self.client.get_symbol_info(symbol)
         filters = {f["filterType"]: f for f in s_info.get("filters", [])}
         return (filters["LOT_SIZE"]["stepSize"], filters["PRICE_FILTER"]["tickSize"])
 
+    def _cap_to_liquidity(self, symbol: str, qty: FixedPoint, step_size: str) -> FixedPoint:
+        """הקטנת כמות קניית שוק כך שמחיר המילוי המוערך מספר הפקודות יישאר בתוך הסליפג' המותר."""
+        if self.order_books is None:
+            return qty
+        book = self.order_books.get_book(symbol)
+        if book is None:
+            logger.warning("order_uncapped_no_book", symbol=symbol, qty=str(qty))
+            return qty
+        max_qty = book.max_buy_qty(float(self.config["max_slippage_percent"]))
+        if float(qty) <= max_qty:
+            return qty
+        capped = FixedPoint.from_step(Decimal(max_qty), step_size)
+        logger.warning("order_capped_by_liquidity", symbol=symbol, requested=str(qty), capped=str(capped))
+        return capped
+
     async def open_trade(self, symbol: str):
         trade_id = await TradeRepository.create_pending_trade(symbol)
         try:
             step_size, tick_size = await self._get_precision_tools(symbol)
             ticker = await self.client.get_ticker(symbol=symbol)
-            curr_price = Decimal(str(ticker["lastPrice"]))
+            curr_price = Decimal(ticker["lastPrice"])
 
             account = await self.client.get_account()
             usdt_free = Decimal(next((b["free"] for b in account["balances"] if b["asset"] == "USDT"), "0"))
             
-            pos_size_usdt = usdt_free * (Decimal(str(self.config["position_size_percent"])) / 100)
-            qty = round_to_precision(pos_size_usdt / curr_price, step_size)
+            pos_size_usdt = usdt_free * (to_decimal(self.config["position_size_percent"]) / 100)
+            qty = self._cap_to_liquidity(symbol, FixedPoint.from_step(pos_size_usdt / curr_price, step_size), step_size)
 
-            if qty <= 0:
+            if qty.units <= 0:
                 await TradeRepository.close_trade(trade_id, "FAILED_INSUFFICIENT_FUNDS")
                 return None
 
+            price = FixedPoint.from_decimal(curr_price, decimals_for(tick_size) + AVG_PRICE_EXTRA_DECIMALS)
+            order = None
             if not self.config["dry_run"]:
-                await self.client.order_market_buy(symbol=symbol, quantity=float(qty))
-                tp_order = await self.place_tp_order(symbol, qty, curr_price)
+                order = await self.client.order_market_buy(symbol=symbol, quantity=float(qty))
+                tp_order = await self.place_tp_order(symbol, qty, price)
                 tp_id = tp_order["orderId"] if tp_order else "MANUAL_REQUIRED"
             else:
                 tp_id = "DRY_RUN_TP"
 
-            await TradeRepository.confirm_trade(trade_id, curr_price, qty, tp_id)
+            await TradeRepository.confirm_trade(trade_id, price, qty, tp_id)
+            self._journal_fill(trade_id, symbol, EVENT_OPEN, order, price, qty)
             return True
         except Exception as e:
             logger.error("critical_trade_error", symbol=symbol, error=str(e))
@@ -74,35 +101,45 @@ class TradeManager:
         symbol = trade['symbol']
         try:
             step_size, tick_size = await self._get_precision_tools(symbol)
+
+            # הכמות נקבעת לפני ביטול ה-TP, כדי שלא נשאיר פוזיציה בלי TP אם אין נזילות
+            base_qty = trade['base_qty'].rescale(decimals_for(step_size))
+            scale = to_decimal(self.config['dca_scales'][trade['dca_count']])
+            buy_qty = FixedPoint.from_step(base_qty.to_decimal() * scale, step_size)
+            buy_qty = self._cap_to_liquidity(symbol, buy_qty, step_size)
+            if buy_qty.units <= 0:
+                return False
             
             if not self.config["dry_run"] and trade['tp_order_id'] not in ["DRY_RUN_TP", "MANUAL_REQUIRED"]:
                 try:
                     await self.client.cancel_order(symbol=symbol, orderId=trade['tp_order_id'])
                 except: pass
 
-            scale = Decimal(str(self.config['dca_scales'][trade['dca_count']]))
-            buy_qty = round_to_precision(trade['base_qty'] * scale, step_size)
-            
             ticker = await self.client.get_ticker(symbol=symbol)
-            curr_price = Decimal(str(ticker["lastPrice"]))
+            price_decimals = decimals_for(tick_size) + AVG_PRICE_EXTRA_DECIMALS
+            curr_price = FixedPoint.from_str(ticker["lastPrice"], price_decimals)
 
+            order = None
             if not self.config["dry_run"]:
-                await self.client.order_market_buy(symbol=symbol, quantity=float(buy_qty))
+                order = await self.client.order_market_buy(symbol=symbol, quantity=float(buy_qty))
             
-            total_qty = trade['base_qty'] + buy_qty
-            new_avg_price = ((trade['base_qty'] * trade['avg_price']) + (buy_qty * curr_price)) / total_qty
+            # מיצוע בשלמים בלבד - ללא חלוקת Decimal
+            total_qty = base_qty + buy_qty
+            new_avg_price = weighted_avg_price(base_qty, trade['avg_price'], buy_qty, curr_price, price_decimals)
             
             tp_order = await self.place_tp_order(symbol, total_qty, new_avg_price)
             tp_id = tp_order["orderId"] if tp_order else "MANUAL_REQUIRED"
             
             await TradeRepository.confirm_trade(trade['id'], new_avg_price, total_qty, tp_id, trade['dca_count'] + 1)
+            self._journal_fill(trade['id'], symbol, EVENT_DCA, order, curr_price, buy_qty)
             return True
         except Exception as e:
             logger.error("dca_execution_error", symbol=symbol, error=str(e))
             return False
 
-    async def place_tp_order(self, symbol: str, quantity: Decimal, avg_price: Decimal):
+    async def place_tp_order(self, symbol: str, quantity: FixedPoint, avg_price: FixedPoint):
         _, tick_size = await self._get_precision_tools(symbol)
-        tp_price = round_to_precision(avg_price * (1 + Decimal(str(self.config["tp_percent"])) / 100), tick_size)
+        tp_factor = FixedPoint.from_decimal(1 + to_decimal(self.config["tp_percent"]) / 100, AVG_PRICE_EXTRA_DECIMALS)
+        tp_price = avg_price.mul(tp_factor, decimals_for(tick_size))
         if self.config["dry_run"]: return {"orderId": "DRY_RUN_TP"}
         return await self.client.order_limit_sell(symbol=symbol, quantity=float(quantity), price=str(tp_price))
\ No newline at end of file
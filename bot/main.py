@@ -3,21 +3,31 @@ import os
 import time
 import structlog
 from bot.database.database_service import create_tables, TradeRepository
+from bot.database.trade_journal import TradeJournal, EVENT_CLOSE, fill_from_order
+from bot.utils.fixed_point import FixedPoint
+from bot.utils.retry import CircuitOpenError, breaker_states
 from bot.logic.trade_manager import TradeManager
-from bot.logic.signal_engine import check_entry_conditions
+from bot.logic.signal_engine import check_entry_conditions, get_entry_reference
+from bot.logic.candidate_index import CandidateIndex
 from bot.logic.dca_engine import check_dca_conditions
-from bot.exchange.binance_service import get_usdt_pairs, filter_by_volume
+from bot.exchange.binance_service import get_usdt_pairs, filter_by_volume, get_order, get_order_fills
 from bot.exchange.websocket_manager import PriceCache
+from bot.exchange.order_book import OrderBookManager
 from bot.notifications.telegram_service import TelegramService
 
 logger = structlog.get_logger(__name__)
 
 class TradingEngine:
-    def __init__(self, config, client):
+    def __init__(self, config, client, diagnostics=None):
         self.config = config
         self.client = client
-        self.manager = TradeManager(client, config.model_dump())
+        self.diagnostics = diagnostics
+        self.order_books = OrderBookManager(client)
+        self.journal = TradeJournal()
+        self.manager = TradeManager(client, config.model_dump(), self.order_books, self.journal)
         self.price_cache = PriceCache(client)
+        self.candidates = CandidateIndex(config.dip_threshold)
+        self.price_cache.add_listener(self.candidates.on_ticker)
         self.running = True
         self.last_heartbeat = None
         self.heartbeat_interval = 300  # 5 minutes
@@ -43,7 +53,9 @@ class TradingEngine:
                                status="running",
                                open_positions=len(open_trades),
                                cached_prices=cached_prices,
-                               websocket_healthy=self.price_cache.is_healthy())
+                               websocket_healthy=self.price_cache.is_healthy(),
+                               api=breaker_states(),
+                               loop_lag=self.diagnostics.lag.stats() if self.diagnostics else None)
                     self.last_heartbeat = now
                 
                 # בדיקת בריאות Websocket
@@ -53,6 +65,10 @@ class TradingEngine:
                     continue
 
                 open_trades = await TradeRepository.get_open_trades()
+
+                # ספרי פקודות רק לעסקאות פתוחות ולמועמדים המובילים
+                await self.order_books.sync({t['symbol'] for t in open_trades}
+                                            | set(self.candidates.peek_best(self.config.max_positions)))
                 
                 # --- לוגיקת DCA: ניהול פוזיציות קיימות ---
                 for trade in open_trades:
@@ -81,22 +97,58 @@ class TradingEngine:
                 await asyncio.sleep(15)
 
     async def _scan_for_new_entries(self, open_trades):
-        all_symbols = await get_usdt_pairs(self.client, self.config)
-        vetted = await filter_by_volume(self.client, all_symbols, float(self.config.min_24h_volume))
-        
+        try:
+            all_symbols = await get_usdt_pairs(self.client, self.config)
+            vetted = await filter_by_volume(self.client, all_symbols, float(self.config.min_24h_volume))
+        except CircuitOpenError as e:
+            logger.warning("scan_skipped_circuit_open", endpoint=e.name, retry_in=e.retry_in)
+            return
+        except Exception as e:
+            logger.error("scan_universe_error", error=str(e))
+            return
+        config = self.config.model_dump()
+        self.candidates.retain(vetted)
+
+        # ערכי ייחוס (SMA + פתיחת נר) נטענים פעם אחת לכל נר; מחירים מגיעים מה-WebSocket
+        now = time.time()
         for symbol in vetted:
-            if any(t['symbol'] == symbol for t in open_trades): continue
-            
-            # אופטימיזציה: העברת ה-price_cache כדי למנוע קריאות API מיותרות
-            if await check_entry_conditions(self.client, symbol, self.config.model_dump()):
+            if not self.candidates.needs_reference(symbol, now): continue
+            ref = await get_entry_reference(self.client, symbol, config)
+            if not ref: continue
+            self.candidates.set_reference(symbol, *ref)
+            price = self.price_cache.get_price(symbol)
+            if price is not None:
+                self.candidates.update(symbol, float(price))
+
+        open_symbols = {t['symbol'] for t in open_trades}
+        slots = self.config.max_positions - len(open_trades)
+        # מועמד שנפסל באימות לא משאיר משבצת ריקה - ממשיכים לשלוף עד שהמשבצות מתמלאות או שה-heap ריק
+        while slots > 0:
+            batch = self.candidates.pop_best(slots, exclude=open_symbols)
+            if not batch:
+                break
+            for symbol in batch:
+                # אימות אחרון מול הנר העדכני לפני כניסה
+                if not await check_entry_conditions(self.client, symbol, config):
+                    continue
+                # בלי ספר פקודות מסונכרן אין תקרת סליפג' - לא שולחים קניית שוק עיוורת
+                if await self.order_books.wait_for_book(symbol) is None:
+                    logger.warning("entry_skipped_no_book", symbol=symbol)
+                    continue
                 success = await self.manager.open_trade(symbol)
+                if success is None:
+                    return  # אין יתרת USDT - גם המועמדים הבאים ייכשלו
                 if success:
+                    open_symbols.add(symbol)
+                    slots -= 1
                     await self.notify(f"✅ עסקה חדשה: <b>{symbol}</b>")
-                    break
 
     async def initialize(self):
         logger.info("system_startup")
         await create_tables()
+        self.journal.start()
+        if self.diagnostics:
+            await self.diagnostics.start()
         await self.price_cache.start()
         
         # Wait for WebSocket to connect and receive initial data
@@ -116,13 +168,35 @@ class TradingEngine:
         for t in trades:
             if self.config.dry_run: continue
             try:
-                order = await self.client.get_order(symbol=t['symbol'], orderId=t['tp_order_id'])
+                order = await get_order(self.client, t['symbol'], t['tp_order_id'])
                 if order and order['status'] == 'FILLED':
                     await TradeRepository.close_trade(t['id'], "CLOSED_PROFIT")
+                    await self._journal_close(t, order)
                     await self.notify(f"💰 רווח מומש: <b>{t['symbol']}</b>")
             except Exception as e:
                 logger.error("reconcile_error", symbol=t['symbol'], error=str(e))
 
+    async def _journal_close(self, trade: dict, order: dict):
+        """רישום סגירה לפי זמן המילוי בפועל (updateTime), כולל עמלות המכירה מה-fills."""
+        price = FixedPoint.from_str(order['price'], trade['avg_price'].decimals)
+        qty = FixedPoint.from_str(order['executedQty'], trade['base_qty'].decimals)
+        try:
+            fills = await get_order_fills(self.client, trade['symbol'], order['orderId'])
+        except Exception as e:
+            # בלי fills נרשמת הסגירה ללא עמלה - symbol_pnl יהיה גבוה בשיעור העמלה
+            logger.warning("close_fills_unavailable", symbol=trade['symbol'], error=str(e))
+            fills = None
+        price, qty, fee, fee_asset = fill_from_order({"fills": fills}, price, qty)
+        ts = order['updateTime'] / 1000 if order.get('updateTime') else None
+        self.journal.record(trade['id'], trade['symbol'], EVENT_CLOSE, price, qty, fee, fee_asset, ts=ts)
+
+    async def shutdown(self):
+        """עצירה מסודרת: ריקון יומן האירועים וסגירת ה-streams."""
+        self.running = False
+        await self.journal.stop()
+        await self.order_books.stop()
+        await self.price_cache.stop()
+
     async def notify(self, message: str):
         if self.telegram and self.chat_id:
             await self.telegram.send_message(self.chat_id, f"🤖 <b>SpotBot:</b>\n{message}")
@@ -133,11 +207,20 @@ if __name__ == "__main__":
     from dotenv import load_dotenv
     from binance import AsyncClient
     from bot.config_model import BotConfig
+    from bot.utils.log_pipeline import configure_logging
+    from bot.utils.diagnostics import Diagnostics
 
     # טעינת משתני סביבה
     load_dotenv()
 
     async def main():
+        log_listener = configure_logging()
+        try:
+            await _run()
+        finally:
+            log_listener.stop()
+
+    async def _run():
         # בדיקה שקובץ הקונפיגורציה קיים
         if not os.path.exists("config/config.yaml"):
             print("Error: Config file not found in config/config.yaml")
@@ -179,14 +262,24 @@ if __name__ == "__main__":
             return
 
         client = await AsyncClient.create(api_key, api_secret)
+
+        # מצב אבחון: מוניטור lag תמיד, פרופיל לפי SIGUSR1 או DIAGNOSTICS_PORT
+        diagnostics = None
+        if os.getenv("DIAGNOSTICS_ENABLED", "1").lower() not in ("0", "false", "no"):
+            diagnostics = Diagnostics(port=int(os.getenv("DIAGNOSTICS_PORT") or 0) or None)
         
+        engine = None
         try:
             # יצירת המנוע והרצה
-            engine = TradingEngine(config, client)
+            engine = TradingEngine(config, client, diagnostics)
             await engine.run()
         except Exception as e:
             print(f"Fatal error: {e}")
         finally:
+            if engine:
+                await engine.shutdown()
+            if diagnostics:
+                await diagnostics.stop()
             await client.close_connection()
 
     try:
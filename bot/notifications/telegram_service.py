@@ -12,6 +12,6 @@ class TelegramService:
         try:
             # תיקון: שימוש במחרוזת 'HTML' במקום telegram.ParseMode.HTML
             await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
-            logger.info(f"Sent Telegram message: {text}")
+            logger.debug("telegram_sent", chars=len(text))
         except Exception as e:
-            logger.error(f"Error sending Telegram message: {e}")
\ No newline at end of file
+            logger.error("telegram_send_error", error=str(e))
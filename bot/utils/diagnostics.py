@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+import structlog
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+logger = structlog.get_logger(__name__)
+
+DIAGNOSTICS_DIR = "diagnostics"
+
+class LoopLagMonitor:
+    """
+    מודד השהיית event loop באופן רציף: משימה שישנה interval ובודקת באיחור של כמה התעוררה.
+    תהליכון watchdog מזהה חסימה מעבר ל-block_threshold ורושם את ה-stack של תהליכון ה-loop.
+    """
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.25):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+        self.blocked_count = 0
+        self._tick = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._tick = time.monotonic()
+        self._task = asyncio.create_task(self._measure())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def _measure(self):
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(0.0, now - expected)
+                self._tick = now
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self.avg_lag = 0.9 * self.avg_lag + 0.1 * lag
+        except asyncio.CancelledError:
+            pass
+
+    def _watch(self):
+        reported_tick = None
+        while not self._stop.wait(self.block_threshold / 2):
+            blocked_for = time.monotonic() - self._tick - self.interval
+            if blocked_for < self.block_threshold or reported_tick == self._tick:
+                continue
+            # מדווחים פעם אחת לכל חסימה
+            reported_tick = self._tick
+            self.blocked_count += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            logger.warning("event_loop_blocked", blocked_ms=round(blocked_for * 1000), stack=stack)
+
+    def stats(self) -> dict:
+        return {
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "avg_lag_ms": round(self.avg_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "blocked_count": self.blocked_count,
+        }
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+def _stamp() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+def _sample_stacks(thread_id: int, duration: float, interval: float) -> Counter:
+    """Sampling profiler: דוגם את ה-stack של תהליכון ה-loop כל interval שניות."""
+    samples = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            samples[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return samples
+
+class Diagnostics:
+    """
+    מצב אבחון לבוט הרץ: מוניטור השהיית loop רציף, ולפי דרישה (SIGUSR1 או socket מקומי)
+    פרופיל CPU דגום ו-snapshot של tracemalloc לקבצים בתיקיית DIAGNOSTICS_DIR.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, port: Optional[int] = None,
+                 profile_seconds: float = 30.0, sample_interval: float = 0.005):
+        self.output_dir = output_dir or os.getenv("DIAGNOSTICS_DIR", DIAGNOSTICS_DIR)
+        self.port = port
+        self.profile_seconds = profile_seconds
+        self.sample_interval = sample_interval
+        self.lag = LoopLagMonitor()
+        self._server = None
+        self._busy = asyncio.Lock()
+
+    async def start(self):
+        self.lag.start()
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                loop.add_signal_handler(signal.SIGUSR1, self._on_signal)
+            except (NotImplementedError, RuntimeError):
+                pass
+        if self.port:
+            self._server = await asyncio.start_server(self._handle_client, "127.0.0.1", self.port)
+            logger.info("diagnostics_listening", port=self.port)
+
+    def _on_signal(self):
+        task = asyncio.ensure_future(self.capture())
+        task.add_done_callback(self._log_task_error)
+
+    @staticmethod
+    def _log_task_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("diagnostics_capture_error", error=str(task.exception()))
+
+    async def _exclusive(self, coro):
+        """לכידה אחת בכל פעם - לכידות חופפות (למשל שני SIGUSR1) נדחות."""
+        if self._busy.locked():
+            coro.close()
+            logger.warning("diagnostics_busy")
+            return None
+        async with self._busy:
+            return await coro
+
+    async def capture(self, seconds: Optional[float] = None) -> Optional[dict]:
+        """פרופיל CPU ו-snapshot זיכרון במקביל, לאורך seconds שניות."""
+        async def _both():
+            cpu, memory = await asyncio.gather(self._profile_cpu(seconds), self._snapshot_memory(seconds))
+            return {"cpu": cpu, "memory": memory}
+        return await self._exclusive(_both())
+
+    async def profile_cpu(self, seconds: Optional[float] = None) -> Optional[str]:
+        return await self._exclusive(self._profile_cpu(seconds))
+
+    async def snapshot_memory(self, seconds: Optional[float] = None) -> Optional[str]:
+        return await self._exclusive(self._snapshot_memory(seconds))
+
+    async def _profile_cpu(self, seconds: Optional[float] = None) -> str:
+        """כותב stacks דגומים בפורמט folded (flamegraph.pl / speedscope)."""
+        duration = seconds or self.profile_seconds
+        logger.info("cpu_profile_started", seconds=duration)
+        path = await asyncio.to_thread(self._write_cpu_profile, duration)
+        logger.info("cpu_profile_written", path=path)
+        return path
+
+    def _write_cpu_profile(self, duration: float) -> str:
+        samples = _sample_stacks(self.lag._loop_thread_id, duration, self.sample_interval)
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"cpu-{_stamp()}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    async def _snapshot_memory(self, seconds: Optional[float] = None) -> str:
+        """מפעיל tracemalloc (אם לא פעיל), מחכה seconds ושומר snapshot ודוח הקצאות מובילות."""
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(25)
+        try:
+            await asyncio.sleep(seconds or self.profile_seconds)
+        except BaseException:
+            if started_here:
+                tracemalloc.stop()
+            raise
+        # snapshot, dump וסטטיסטיקה יכולים לקחת שניות על heap גדול - מחוץ ל-event loop
+        path = await asyncio.to_thread(self._write_memory_snapshot, started_here)
+        logger.info("memory_snapshot_written", path=path)
+        return path
+
+    def _write_memory_snapshot(self, stop_tracing: bool, top: int = 50) -> str:
+        try:
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if stop_tracing:
+                tracemalloc.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"memory-{_stamp()}")
+        snapshot.dump(base + ".tracemalloc")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+        return base + ".tracemalloc"
+
+    async def _handle_client(self, reader, writer):
+        """פקודות בשורה אחת: lag | profile [s] | memory [s] | capture [s]."""
+        try:
+            parts = (await reader.readline()).decode().split()
+            command = parts[0] if parts else "lag"
+            seconds = float(parts[1]) if len(parts) > 1 else None
+            if command == "profile":
+                result = {"cpu": await self.profile_cpu(seconds)}
+            elif command == "memory":
+                result = {"memory": await self.snapshot_memory(seconds)}
+            elif command == "capture":
+                result = await self.capture(seconds)
+            else:
+                result = self.lag.stats()
+            writer.write((json.dumps(result) + "\n").encode())
+            await writer.drain()
+        except Exception as e:
+            logger.error("diagnostics_command_error", error=str(e))
+        finally:
+            writer.close()
+
+    async def stop(self):
+        self.lag.stop()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
@@ -0,0 +1,114 @@
+from decimal import Decimal, ROUND_FLOOR
+from typing import Union
+
+# דיוק נוסף למחיר ממוצע (מעבר ל-tickSize) כדי שמיצוע DCA לא יאבד ספרות
+AVG_PRICE_EXTRA_DECIMALS = 8
+
+
+def decimals_for(step_size: str) -> int:
+    """מספר הספרות אחרי הנקודה ש-round_to_precision משתמש בהן עבור stepSize/tickSize."""
+    return max(0, -Decimal(str(step_size)).as_tuple().exponent)
+
+
+class FixedPoint:
+    """ערך נקודה קבועה מבוסס int: value == units / 10**decimals."""
+
+    __slots__ = ("units", "decimals")
+
+    def __init__(self, units: int, decimals: int):
+        self.units = units
+        self.decimals = decimals
+
+    @classmethod
+    def from_decimal(cls, value: Decimal, decimals: int) -> "FixedPoint":
+        """המרה עם עיגול כלפי מטה (ROUND_FLOOR), בדיוק כמו round_to_precision."""
+        units = value.scaleb(decimals).to_integral_value(rounding=ROUND_FLOOR)
+        return cls(int(units), decimals)
+
+    @classmethod
+    def from_step(cls, value: Decimal, step_size: str) -> "FixedPoint":
+        return cls.from_decimal(value, decimals_for(step_size))
+
+    @classmethod
+    def from_str(cls, value: str, decimals: int) -> "FixedPoint":
+        return cls.from_decimal(Decimal(value), decimals)
+
+    def rescale(self, decimals: int) -> "FixedPoint":
+        diff = decimals - self.decimals
+        if diff >= 0:
+            return FixedPoint(self.units * 10 ** diff, decimals)
+        return FixedPoint(self.units // 10 ** -diff, decimals)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.units).scaleb(-self.decimals)
+
+    def mul(self, other: "FixedPoint", decimals: int) -> "FixedPoint":
+        """מכפלה מדויקת בשלמים, מעוגלת כלפי מטה ל-decimals ספרות."""
+        shift = self.decimals + other.decimals - decimals
+        product = self.units * other.units
+        if shift >= 0:
+            return FixedPoint(product // 10 ** shift, decimals)
+        return FixedPoint(product * 10 ** -shift, decimals)
+
+    def _aligned(self, other: "FixedPoint"):
+        if self.decimals == other.decimals:
+            return self.units, other.units, self.decimals
+        d = max(self.decimals, other.decimals)
+        return self.rescale(d).units, other.rescale(d).units, d
+
+    def __add__(self, other: "FixedPoint") -> "FixedPoint":
+        a, b, d = self._aligned(other)
+        return FixedPoint(a + b, d)
+
+    def __sub__(self, other: "FixedPoint") -> "FixedPoint":
+        a, b, d = self._aligned(other)
+        return FixedPoint(a - b, d)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FixedPoint):
+            return NotImplemented
+        a, b, _ = self._aligned(other)
+        return a == b
+
+    def __lt__(self, other: "FixedPoint") -> bool:
+        a, b, _ = self._aligned(other)
+        return a < b
+
+    def __le__(self, other: "FixedPoint") -> bool:
+        a, b, _ = self._aligned(other)
+        return a <= b
+
+    def __hash__(self) -> int:
+        return hash(self.to_decimal())
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __float__(self) -> float:
+        return self.units / 10 ** self.decimals
+
+    def __str__(self) -> str:
+        return str(self.to_decimal())
+
+    def __repr__(self) -> str:
+        return f"FixedPoint({self.to_decimal()!s}, decimals={self.decimals})"
+
+
+def weighted_avg_price(qty_a: FixedPoint, price_a: FixedPoint,
+                       qty_b: FixedPoint, price_b: FixedPoint, decimals: int) -> FixedPoint:
+    """מחיר ממוצע משוקלל של שתי קניות, מחושב כולו בשלמים (עיגול כלפי מטה)."""
+    qa, qb, qd = qty_a._aligned(qty_b)
+    pa, pb, pd = price_a._aligned(price_b)
+    total = qa + qb
+    if total == 0:
+        return FixedPoint(0, decimals)
+    numerator = (qa * pa + qb * pb) * 10 ** decimals
+    return FixedPoint(numerator // (total * 10 ** pd), decimals)
+
+
+def to_decimal(value: Union[FixedPoint, Decimal, str, int, float]) -> Decimal:
+    if isinstance(value, FixedPoint):
+        return value.to_decimal()
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import structlog
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson אופציונלי - נופלים ל-json הסטנדרטי
+    orjson = None
+
+DEFAULT_LOG_FILE = "logs/bot.log"
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_logger = structlog.get_logger(__name__)
+
+def _dumps(obj, **kwargs) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode()
+    return json.dumps(obj, default=str, ensure_ascii=False)
+
+# אירועים שנזרקים לכל סימבול בכל סריקה - רק הם מוגבלים; שגיאות מסחר ו-circuit תמיד נרשמות
+NOISY_EVENTS = ("entry_check_error", "entry_reference_error", "sma_calc_error")
+
+class RateLimitedEvents:
+    """
+    Processor של structlog: מגביל אירועים רועשים לפי שם האירוע (לא לפי סימבול),
+    כך ש-entry_check_error על מאות סימבולים בזמן תקלה לא מציף את הלוג.
+    בסוף חלון (בקריאה הבאה ללוג) או ב-flush() נרשם events_suppressed עם מספר הנזרקים.
+    """
+
+    def __init__(self, limit: int = 5, window: float = 10.0, events: Iterable[str] = NOISY_EVENTS):
+        self.limit = limit
+        self.window = window
+        self.events = frozenset(events)
+        self._state: Dict[str, List] = {}  # event -> [window_start, count, suppressed]
+        # נקרא גם מתהליכונים אחרים (watchdog של האבחון, ספריות)
+        self._lock = threading.Lock()
+
+    def __call__(self, logger, method_name, event_dict):
+        key = event_dict.get("event")
+        now = time.monotonic()
+        drop = False
+        with self._lock:
+            ended = self._pop_windows(lambda start: now - start >= self.window)
+            if key in self.events:
+                state = self._state.get(key)
+                if state is None:
+                    self._state[key] = [now, 1, 0]
+                elif state[1] < self.limit:
+                    state[1] += 1
+                else:
+                    state[2] += 1
+                    drop = True
+        self._report(ended)
+        if drop:
+            raise structlog.DropEvent
+        return event_dict
+
+    def flush(self):
+        """דיווח על כל האירועים שנזרקו בחלונות הפתוחים (למשל ביציאה)."""
+        with self._lock:
+            ended = self._pop_windows(lambda start: True)
+        self._report(ended)
+
+    def _pop_windows(self, done) -> List:
+        ended = [(key, state[2]) for key, state in self._state.items() if done(state[0])]
+        for key, _ in ended:
+            del self._state[key]
+        return [(key, suppressed) for key, suppressed in ended if suppressed]
+
+    @staticmethod
+    def _report(ended: List):
+        for key, suppressed in ended:
+            _logger.warning("events_suppressed", suppressed_event=key, suppressed=suppressed)
+
+class _PipelineListener(QueueListener):
+    """QueueListener שמדווח על אירועים שה-rate limiter זרק לפני שהוא מרוקן את התור."""
+
+    def __init__(self, limiter: RateLimitedEvents, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def stop(self):
+        self.limiter.flush()
+        super().stop()
+
+class _PassThroughQueueHandler(QueueHandler):
+    """QueueHandler שלא מעצב את הרשומה בתהליכון הקורא - כל העיצוב קורה ב-listener."""
+
+    def prepare(self, record):
+        return record
+
+def _capture_exc_info(logger, method_name, event_dict):
+    # sys.exc_info תקף רק בתהליכון הקורא, לכן לוכדים אותו לפני המעבר לתור
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+def _add_timestamp(logger, method_name, event_dict):
+    record = event_dict.get("_record")
+    created = record.created if record is not None else time.time()
+    event_dict["timestamp"] = datetime.fromtimestamp(created, timezone.utc).isoformat()
+    return event_dict
+
+def configure_logging(log_file: Optional[str] = None, level: Optional[str] = None,
+                      rate_limit: int = 5, rate_window: float = 10.0) -> QueueListener:
+    """
+    מגדיר צינור לוגים אחד ל-structlog ול-logging הסטנדרטי: בתהליכון ה-asyncio רק מסננים
+    ומכניסים לתור; רינדור JSON וכתיבה לקובץ מתגלגל מתבצעים בתהליכון רקע.
+    מחזיר את ה-QueueListener - יש לקרוא ל-stop() ביציאה כדי לרוקן את התור.
+    """
+    log_file = log_file or os.getenv("LOG_FILE", DEFAULT_LOG_FILE)
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    if os.path.dirname(log_file):
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+
+    render_chain = [
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+        _add_timestamp,
+        structlog.processors.format_exc_info,
+        structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+    ]
+    file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processors=render_chain + [structlog.processors.JSONRenderer(serializer=_dumps)]))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processors=render_chain + [structlog.dev.ConsoleRenderer(colors=False)]))
+
+    limiter = RateLimitedEvents(rate_limit, rate_window)
+    log_queue = queue.SimpleQueue()
+    listener = _PipelineListener(limiter, log_queue, file_handler, console_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [_PassThroughQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            limiter,
+            _capture_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    listener.start()
+    return listener
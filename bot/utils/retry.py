@@ -1,32 +1,220 @@
 import asyncio
-import logging
 import functools
+import random
+import time
+import structlog
+from collections.abc import Mapping
+from typing import Dict, Optional
 from binance.exceptions import BinanceAPIException
 
-logger = logging.getLogger(__name__)
+logger = structlog.get_logger(__name__)
 
-def retry(max_retries=3, backoff_factor=2):
+RATE_LIMIT_CODES = (429, -1003)
+RATE_LIMIT_STATUS = (418, 429)
+DISCONNECTED_CODE = -1001
+WEIGHT_LIMIT_1M = 6000
+HEDGE_MAX_WEIGHT = WEIGHT_LIMIT_1M // 2  # מעל זה לא שולחים עותקים נוספים
+RATE_LIMIT_GATE = "rate_limit"
+
+class CircuitOpenError(Exception):
+    """הקריאה נחסמה מיידית כי ה-circuit breaker של ה-endpoint (או שער מגבלת הקצב המשותף) פתוח."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"circuit '{name}' open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Circuit breaker ל-endpoint אחד: CLOSED -> OPEN אחרי failure_threshold כשלים רצופים,
+    HALF_OPEN אחרי reset_timeout (קריאת ניסיון אחת), וחזרה ל-CLOSED בהצלחה.
+    כל פתיחה חוזרת מכפילה את זמן ההמתנה עד max_reset_timeout.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 5.0,
+                 max_reset_timeout: float = 300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probe_in_flight = False
+
+    def allow(self):
+        """זורק CircuitOpenError אם אסור לבצע קריאה כרגע."""
+        if self.state == self.CLOSED:
+            return
+        now = time.monotonic()
+        if self.state == self.OPEN and now >= self.opened_until:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        raise CircuitOpenError(self.name, max(0.0, self.opened_until - now))
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("circuit_closed", endpoint=self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """קריאת הניסיון בוטלה (CancelledError) בלי תוצאה - מאפשרים ניסיון חדש."""
+        self._probe_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        self.failures += 1
+        if retry_after is not None:
+            self.trip(retry_after)
+        elif self.state == self.HALF_OPEN:
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self.trip(self.reset_timeout)
+        elif self.failures >= self.failure_threshold:
+            self.trip(self.reset_timeout)
+
+    def trip(self, duration: float):
+        self.state = self.OPEN
+        self.opened_until = max(self.opened_until, time.monotonic() + duration)
+        self._probe_in_flight = False
+        logger.warning("circuit_opened", endpoint=self.name, seconds=round(duration, 2), failures=self.failures)
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": round(max(0.0, self.opened_until - time.monotonic()), 2) if self.state != self.CLOSED else 0.0,
+        }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_used_weight = {"value": 0}
+_rate_limited_until = {"value": 0.0}
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, **kwargs)
+    return _breakers[name]
+
+def breaker_states() -> dict:
+    """מצב כל ה-breakers ומשקל ה-API האחרון, לניטור (heartbeat)."""
+    return {
+        "used_weight_1m": _used_weight["value"],
+        "rate_limited_for": round(max(0.0, _rate_limited_until["value"] - time.monotonic()), 2),
+        "endpoints": {name: b.snapshot() for name, b in _breakers.items()},
+    }
+
+def _headers_of(source) -> dict:
+    response = getattr(source, "response", None)
+    headers = getattr(response, "headers", None)
+    return headers if isinstance(headers, Mapping) else {}
+
+def _note_weight(client):
+    """קריאת x-mbx-used-weight-1m מהתשובה האחרונה של ה-client."""
+    weight = _headers_of(client).get("x-mbx-used-weight-1m")
+    if weight is not None:
+        try:
+            _used_weight["value"] = int(weight)
+        except (TypeError, ValueError):
+            pass
+
+def _retry_after(exc: BinanceAPIException) -> Optional[float]:
+    value = _headers_of(exc).get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _check_rate_limit():
+    """מגבלות המשקל וחסימות 418 של Binance הן לכל ה-IP - לכן השער משותף לכל ה-endpoints."""
+    retry_in = _rate_limited_until["value"] - time.monotonic()
+    if retry_in > 0:
+        raise CircuitOpenError(RATE_LIMIT_GATE, retry_in)
+
+def _trip_rate_limit(seconds: float):
+    _rate_limited_until["value"] = max(_rate_limited_until["value"], time.monotonic() + seconds)
+    logger.warning("circuit_opened", endpoint=RATE_LIMIT_GATE, seconds=round(seconds, 2))
+
+def _backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full jitter; התקרה גדלה ככל שמשקל ה-API המנוצל מתקרב למגבלה."""
+    pressure = 1 + 3 * min(1.0, _used_weight["value"] / WEIGHT_LIMIT_1M)
+    return random.uniform(0, min(max_delay, base_delay * pressure * 2 ** attempt))
+
+async def _hedged(call, hedge_after: float):
+    """מריץ את הקריאה; אם לא חזרה תוך hedge_after שניות שולח עותק נוסף ולוקח את הראשונה שמצליחה."""
+    first = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    second = asyncio.ensure_future(call())
+    pending = {first, second}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+def retry(max_retries=3, base_delay=0.25, max_delay=2.0, name=None, hedge_after=None,
+          failure_threshold=5, reset_timeout=5.0):
+    """
+    עטיפת קריאות API עם circuit breaker ל-endpoint, backoff אקראי (jitter) ו-hedging אופציונלי
+    לקריאות קריאה זולות ואידמפוטנטיות (מושבת כשמשקל ה-API המנוצל גבוה).
+    אחרי מיצוי הניסיונות השגיאה נזרקת - לא מוחזר None.
+    """
     def decorator(func):
+        breaker = get_breaker(name or func.__name__, failure_threshold=failure_threshold,
+                              reset_timeout=reset_timeout)
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
+            client = args[0] if args else None
+            call = functools.partial(func, *args, **kwargs)
+            attempt = 0
+            while True:
+                _check_rate_limit()
+                breaker.allow()
                 try:
-                    return await func(*args, **kwargs)
+                    hedge = hedge_after and _used_weight["value"] < HEDGE_MAX_WEIGHT
+                    result = await (_hedged(call, hedge_after) if hedge else call())
+                    _note_weight(client)
+                    breaker.record_success()
+                    return result
                 except BinanceAPIException as e:
-                    if e.code in [429, -1003]: # Rate Limit
-                        wait_time = backoff_factor ** (retries + 5) # המתנה ארוכה יותר
-                        logger.error(f"RATE_LIMIT_HIT. Waiting {wait_time}s...")
-                        await asyncio.sleep(wait_time)
-                    elif e.code == -1001: # Disconnected
-                        await asyncio.sleep(backoff_factor ** retries)
-                    else:
-                        raise e # שגיאות קריטיות לא מנסים שוב
-                    retries += 1
+                    _note_weight(client)
+                    if e.code in RATE_LIMIT_CODES or e.status_code in RATE_LIMIT_STATUS:
+                        # מגבלת קצב: כל הקריאות לכל ה-endpoints נחסמות עד Retry-After, בלי לחכות כאן
+                        _trip_rate_limit(_retry_after(e) or breaker.reset_timeout)
+                        breaker.release_probe()
+                        logger.error("rate_limit_hit", endpoint=breaker.name, code=e.code)
+                        raise
+                    if e.code != DISCONNECTED_CODE:
+                        breaker.record_success()  # ה-endpoint ענה; שגיאות לוגיות לא מנסים שוב
+                        raise
+                    error = e
+                except asyncio.CancelledError:
+                    breaker.release_probe()
+                    raise
                 except Exception as e:
-                    logger.warning(f"Connection error: {e}. Retrying...")
-                    await asyncio.sleep(backoff_factor ** retries)
-                    retries += 1
-            return None
+                    error = e
+                breaker.record_failure()
+                attempt += 1
+                if attempt >= max_retries:
+                    raise error
+                logger.warning("api_retry", endpoint=breaker.name, attempt=attempt, error=str(error))
+                await asyncio.sleep(_backoff(attempt, base_delay, max_delay))
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,43 @@
+import time
+from decimal import Decimal
+from bot.logic.candidate_index import CandidateIndex
+
+def _index_with_refs():
+    index = CandidateIndex(Decimal("-3"))
+    expires = time.time() + 900
+    # SMA 110, פתיחה 100 לכל הסימבולים
+    for symbol in ("AAAUSDT", "BBBUSDT", "CCCUSDT"):
+        index.set_reference(symbol, Decimal("110"), Decimal("100"), expires)
+    return index
+
+def test_pop_best_orders_by_score():
+    index = _index_with_refs()
+    index.update("AAAUSDT", 96.0)   # ירידה 4%
+    index.update("BBBUSDT", 90.0)   # ירידה 10% - הטוב ביותר
+    index.update("CCCUSDT", 99.0)   # ירידה 1% - לא עומד בסף
+    assert len(index) == 2
+    assert index.pop_best(5) == ["BBBUSDT", "AAAUSDT"]
+    assert index.pop_best(5) == []
+
+def test_price_updates_replace_stale_entries():
+    index = _index_with_refs()
+    index.update("AAAUSDT", 90.0)
+    index.update("BBBUSDT", 95.0)
+    # AAA התאושש מעל סף הירידה - יוצא מהאינדקס
+    index.update("AAAUSDT", 99.5)
+    index.update("BBBUSDT", 80.0)
+    assert index.pop_best(5) == ["BBBUSDT"]
+
+def test_spread_and_exclude():
+    index = _index_with_refs()
+    index.on_ticker({"s": "AAAUSDT", "c": "95", "q": "1000000", "b": "94.9", "a": "95.1"})
+    index.on_ticker({"s": "BBBUSDT", "c": "95", "q": "1000000", "b": "90", "a": "95"})
+    index.on_ticker({"s": "ZZZUSDT", "c": "1"})  # ללא ערכי ייחוס - מתעלמים
+    assert index.pop_best(1, exclude={"AAAUSDT"}) == ["BBBUSDT"]
+
+def test_expired_reference_is_not_returned():
+    index = CandidateIndex(Decimal("-3"))
+    index.set_reference("AAAUSDT", Decimal("110"), Decimal("100"), time.time() - 1)
+    index.update("AAAUSDT", 90.0)
+    assert index.needs_reference("AAAUSDT")
+    assert index.pop_best(1) == []
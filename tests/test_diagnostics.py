@@ -0,0 +1,64 @@
+import asyncio
+import time
+import tracemalloc
+import pytest
+from bot.utils.diagnostics import Diagnostics, LoopLagMonitor
+
+@pytest.mark.asyncio
+async def test_lag_monitor_flags_blocking_call():
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # חוסם את ה-loop בכוונה
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+    stats = monitor.stats()
+    assert stats["blocked_count"] >= 1
+    assert stats["max_lag_ms"] >= 100
+
+@pytest.mark.asyncio
+async def test_profile_and_memory_files(tmp_path):
+    diagnostics = Diagnostics(output_dir=str(tmp_path), sample_interval=0.001)
+    await diagnostics.start()
+    try:
+        result = await diagnostics.capture(0.1)
+    finally:
+        await diagnostics.stop()
+
+    with open(result["cpu"], encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert tracemalloc.Snapshot.load(result["memory"]).traces is not None
+    assert not tracemalloc.is_tracing()
+
+@pytest.mark.asyncio
+async def test_control_socket_reports_lag(tmp_path):
+    diagnostics = Diagnostics(output_dir=str(tmp_path))
+    diagnostics.lag.start()
+    server = await asyncio.start_server(diagnostics._handle_client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"lag\n")
+        await writer.drain()
+        response = await reader.readline()
+        writer.close()
+    finally:
+        server.close()
+        diagnostics.lag.stop()
+    assert b"max_lag_ms" in response
+
+@pytest.mark.asyncio
+async def test_overlapping_captures_are_serialized(tmp_path):
+    diagnostics = Diagnostics(output_dir=str(tmp_path), sample_interval=0.001)
+    await diagnostics.start()
+    try:
+        first, second = await asyncio.gather(diagnostics.capture(0.1), diagnostics.capture(0.1))
+    finally:
+        await diagnostics.stop()
+    # הלכידה השנייה נדחית במקום לשבור את ה-tracemalloc של הראשונה
+    assert first["memory"] and first["cpu"]
+    assert second is None
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,81 @@
+import pytest
+import aiosqlite
+from decimal import Decimal
+from bot.utils.fixed_point import FixedPoint, decimals_for, weighted_avg_price
+from bot.logic.trade_manager import round_to_precision
+from bot.database import database_service
+from bot.database.database_service import create_tables, TradeRepository
+
+@pytest.mark.parametrize("value,step", [
+    ("1.23456789", "0.01"),
+    ("123.456789", "0.1"),
+    ("0.000123456", "0.00001000"),
+    ("42.9", "1"),
+    ("-1.2345", "0.001"),
+])
+def test_from_step_matches_round_to_precision(value, step):
+    # העיגול חייב להיות זהה לזה של round_to_precision
+    fp = FixedPoint.from_step(Decimal(value), step)
+    assert fp.to_decimal() == round_to_precision(Decimal(value), step)
+    assert fp.decimals == decimals_for(step)
+
+def test_arithmetic_is_exact():
+    a = FixedPoint.from_str("0.1", 8)
+    b = FixedPoint.from_str("0.2", 2)
+    assert (a + b).to_decimal() == Decimal("0.3")
+    assert (b - a).to_decimal() == Decimal("0.1")
+    assert a < b
+    # 2.5 * 1.025 = 2.5625 -> floor לשתי ספרות
+    price = FixedPoint.from_str("2.5", 4)
+    factor = FixedPoint.from_str("1.025", 8)
+    assert price.mul(factor, 2).to_decimal() == Decimal("2.56")
+
+def test_weighted_avg_price():
+    # 1 @ 100 + 2 @ 85 -> 90
+    avg = weighted_avg_price(FixedPoint.from_str("1", 3), FixedPoint.from_str("100", 4),
+                             FixedPoint.from_str("2", 3), FixedPoint.from_str("85", 2), 6)
+    assert avg.to_decimal() == Decimal("90")
+
+@pytest.mark.asyncio
+async def test_trade_round_trip_as_integers(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_service, "DATABASE_FILE", str(tmp_path / "trades.db"))
+    await create_tables()
+
+    trade_id = await TradeRepository.create_pending_trade("BTCUSDT")
+    price = FixedPoint.from_str("43210.12345678", 10)
+    qty = FixedPoint.from_str("0.00123", 5)
+    await TradeRepository.confirm_trade(trade_id, price, qty, "TP1")
+
+    trades = await TradeRepository.get_open_trades()
+    assert trades[0]["avg_price"] == price
+    assert trades[0]["base_qty"].to_decimal() == Decimal("0.00123")
+    assert trades[0]["base_qty"].decimals == 5
+
+@pytest.mark.asyncio
+async def test_migrates_baseline_text_schema(tmp_path, monkeypatch):
+    path = str(tmp_path / "trades.db")
+    monkeypatch.setattr(database_service, "DATABASE_FILE", path)
+    # הסכמה הישנה: מחיר וכמות כטקסט עשרוני
+    async with aiosqlite.connect(path) as db:
+        await db.execute("""
+            CREATE TABLE trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT NOT NULL, status TEXT NOT NULL,
+                avg_price TEXT NOT NULL, base_qty TEXT NOT NULL, dca_count INTEGER NOT NULL,
+                tp_order_id TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await db.execute("INSERT INTO trades (symbol, status, avg_price, base_qty, dca_count, tp_order_id) "
+                         "VALUES ('BTCUSDT', 'OPEN', '1.1536', '0.005', 1, 'TP1')")
+        await db.commit()
+
+    await create_tables()
+
+    async with aiosqlite.connect(path) as db:
+        async with db.execute("SELECT typeof(avg_price), typeof(base_qty) FROM trades") as cursor:
+            assert await cursor.fetchone() == ("integer", "integer")
+    trades = await TradeRepository.get_open_trades()
+    assert trades[0]["avg_price"].to_decimal() == Decimal("1.1536")
+    assert trades[0]["base_qty"] == FixedPoint.from_str("0.005", 3)
+    assert trades[0]["dca_count"] == 1 and trades[0]["tp_order_id"] == "TP1"
+    # המזהים נשמרים ו-AUTOINCREMENT ממשיך מהם
+    assert await TradeRepository.create_pending_trade("ETHUSDT") == 2
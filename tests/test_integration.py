@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from decimal import Decimal
 from bot.main import TradingEngine
 from bot.config_model import BotConfig
+from bot.utils.fixed_point import FixedPoint
 
 @pytest.mark.asyncio
 async def test_trading_engine_initialization():
@@ -40,6 +41,7 @@ async def test_engine_skips_when_unhealthy():
     config.dca_scales = [Decimal("1.0")]
     config.blacklist = []
     config.min_24h_volume = Decimal("1000000")
+    config.dip_threshold = Decimal("-3.0")
     config.model_dump.return_value = {
         "max_positions": 5,
         "sleep_interval": 60,
@@ -74,4 +76,75 @@ async def test_engine_skips_when_unhealthy():
         # בתוך ה-run הוא אמור להיעצר ב-is_healthy() ולעשות continue מבלי לקרוא ל-get_open_trades בפעם השנייה
         assert mock_trades.call_count == 1
         # מוודא שהדילוג אכן קרה ושהוא ניסה לישון 10 שניות כמתוכנן
-        mock_sleep.assert_called_with(10)
\ No newline at end of file
+        mock_sleep.assert_called_with(10)
+
+
+@pytest.mark.asyncio
+async def test_close_is_journaled_with_fill_time_and_fee():
+    """סגירה נרשמת לפי updateTime של הפקודה וכוללת את עמלת המכירה"""
+    config = BotConfig(
+        timeframe='15m', sma_length=150,
+        dip_threshold=Decimal("-3.0"), position_size_percent=Decimal("10"),
+        tp_percent=Decimal("5"), dca_scales=[Decimal("1.0")],
+        dca_trigger=Decimal("3.5"), max_positions=5,
+        min_24h_volume=Decimal("1000000"), daily_loss_limit=Decimal("10"),
+        sleep_interval=60, blacklist=[], dry_run=False
+    )
+    client = AsyncMock()
+    client.get_my_trades.return_value = [
+        {"price": "105", "qty": "1", "commission": "0.105", "commissionAsset": "USDT"}]
+    engine = TradingEngine(config, client)
+    engine.journal = MagicMock()
+
+    trade = {"id": 7, "symbol": "BTCUSDT",
+             "avg_price": FixedPoint.from_str("100", 4), "base_qty": FixedPoint.from_str("1", 3)}
+    order = {"orderId": 1, "price": "105", "executedQty": "1", "updateTime": 1700000000000}
+    await engine._journal_close(trade, order)
+
+    args, kwargs = engine.journal.record.call_args
+    assert args[2] == "CLOSE"
+    assert args[5].to_decimal() == Decimal("0.105")
+    assert kwargs["ts"] == 1700000000
+
+
+@pytest.mark.asyncio
+async def test_shutdown_stops_journal_and_streams():
+    config = MagicMock(spec=BotConfig)
+    config.dip_threshold = Decimal("-3.0")
+    engine = TradingEngine(config, AsyncMock())
+    engine.journal = MagicMock(stop=AsyncMock())
+    engine.order_books = MagicMock(stop=AsyncMock())
+    engine.price_cache = MagicMock(stop=AsyncMock())
+
+    await engine.shutdown()
+
+    engine.journal.stop.assert_awaited_once()
+    engine.order_books.stop.assert_awaited_once()
+    engine.price_cache.stop.assert_awaited_once()
+    assert engine.running is False
+
+
+@pytest.mark.asyncio
+async def test_rejected_candidates_fall_through_to_lower_ranked():
+    """מועמד שנפסל באימות האחרון לא משאיר משבצת ריקה עד האיטרציה הבאה"""
+    config = MagicMock(spec=BotConfig)
+    config.dip_threshold = Decimal("-3.0")
+    config.max_positions = 2
+    config.min_24h_volume = Decimal("0")
+    config.model_dump.return_value = {}
+    engine = TradingEngine(config, AsyncMock())
+    engine.candidates = MagicMock()
+    engine.candidates.needs_reference.return_value = False
+    engine.candidates.pop_best.side_effect = [["AAAUSDT", "BBBUSDT"], ["CCCUSDT"], ["DDDUSDT"]]
+    engine.order_books = MagicMock(wait_for_book=AsyncMock(return_value=MagicMock()))
+    engine.manager = MagicMock(open_trade=AsyncMock(return_value=True))
+
+    with patch('bot.main.get_usdt_pairs', new_callable=AsyncMock, return_value=[]), \
+         patch('bot.main.filter_by_volume', new_callable=AsyncMock, return_value=[]), \
+         patch('bot.main.check_entry_conditions', new_callable=AsyncMock,
+               side_effect=lambda client, symbol, config: symbol != "AAAUSDT"):
+        await engine._scan_for_new_entries([])
+
+    opened = [c.args[0] for c in engine.manager.open_trade.await_args_list]
+    assert opened == ["BBBUSDT", "CCCUSDT"]
+    assert engine.candidates.pop_best.call_args_list[1].args[0] == 1
@@ -0,0 +1,64 @@
+import json
+import logging
+import pytest
+import structlog
+from structlog.testing import capture_logs
+from bot.utils.log_pipeline import configure_logging, RateLimitedEvents
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    root.handlers, root.level = handlers, level
+    structlog.reset_defaults()
+
+def test_rate_limiter_drops_and_reports_suppressed():
+    limiter = RateLimitedEvents(limit=2, window=60)
+    for _ in range(2):
+        assert limiter(None, "error", {"event": "entry_check_error"})
+    for _ in range(3):
+        with pytest.raises(structlog.DropEvent):
+            limiter(None, "error", {"event": "entry_check_error"})
+    # אירועים שלא ברשימה (שגיאות מסחר, circuit) אף פעם לא נזרקים
+    for _ in range(5):
+        assert limiter(None, "error", {"event": "critical_trade_error"})
+
+    # החלון נגמר: הספירה מדווחת בקריאה הבאה ללוג, גם אם האירוע עצמו לא חוזר
+    limiter._state["entry_check_error"][0] -= 61
+    with capture_logs() as logs:
+        assert limiter(None, "info", {"event": "heartbeat"})
+    assert logs == [{"event": "events_suppressed", "suppressed_event": "entry_check_error",
+                     "suppressed": 3, "log_level": "warning"}]
+    assert limiter(None, "error", {"event": "entry_check_error"})
+
+def test_rate_limiter_flush_reports_open_windows():
+    limiter = RateLimitedEvents(limit=1, window=60)
+    limiter(None, "error", {"event": "sma_calc_error"})
+    with pytest.raises(structlog.DropEvent):
+        limiter(None, "error", {"event": "sma_calc_error"})
+    with capture_logs() as logs:
+        limiter.flush()
+    assert [(l["suppressed_event"], l["suppressed"]) for l in logs] == [("sma_calc_error", 1)]
+
+def test_pipeline_writes_json_from_background_thread(tmp_path, restore_logging):
+    log_file = tmp_path / "bot.log"
+    listener = configure_logging(str(log_file), level="INFO", rate_limit=1)
+    try:
+        logger = structlog.get_logger("bot.test")
+        logger.info("heartbeat", open_positions=2)
+        logger.error("entry_check_error", symbol="AAAUSDT")
+        logger.error("entry_check_error", symbol="BBBUSDT")  # נזרק על ידי ה-rate limiter
+        logger.debug("too_verbose")
+        logging.getLogger("aiosqlite").warning("stdlib message")
+    finally:
+        listener.stop()
+
+    lines = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    # הספירה של מה שנזרק נרשמת בעצירת ה-listener
+    assert [l["event"] for l in lines] == ["heartbeat", "entry_check_error", "stdlib message", "events_suppressed"]
+    assert lines[0]["open_positions"] == 2
+    assert lines[0]["level"] == "info"
+    assert lines[1]["symbol"] == "AAAUSDT"
+    assert lines[2]["logger"] == "aiosqlite"
+    assert lines[3]["suppressed"] == 1
@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+from bot.exchange.order_book import OrderBook, OrderBookManager
+from bot.logic.trade_manager import TradeManager
+from bot.utils.fixed_point import FixedPoint
+
+def _book():
+    book = OrderBook("BTCUSDT")
+    book.load_snapshot({
+        "lastUpdateId": 100,
+        "asks": [["101", "1"], ["102", "2"], ["105", "10"]],
+        "bids": [["100", "3"], ["99", "5"]],
+    })
+    return book
+
+def test_apply_diff_updates_levels():
+    book = _book()
+    # עדכון ישן - מתעלמים
+    assert book.apply_diff({"U": 90, "u": 100, "a": [["101", "0"]], "b": []})
+    assert book.best_ask() == 101.0
+    # עדכון ראשון אחרי ה-snapshot: U <= 101 <= u
+    assert book.apply_diff({"U": 95, "u": 105, "a": [["101", "0"], ["100.5", "1"]], "b": [["100", "0"]]})
+    assert book.best_ask() == 100.5
+    assert book.best_bid() == 99.0
+    assert book.last_update_id == 105
+
+def test_gap_requires_resync():
+    book = _book()
+    assert not book.apply_diff({"U": 110, "u": 112, "a": [], "b": []})
+    assert not book.synced
+
+def test_max_buy_qty():
+    book = _book()
+    # סליפג' 1%: גבול 102.01 - שתי הרמות הראשונות (ממוצע 101.67) ועוד חלק מ-105
+    qty = book.max_buy_qty(1)
+    avg = (101 + 2 * 102 + 105 * (qty - 3)) / qty
+    assert 3 < qty < 13
+    assert abs(avg - 101 * 1.01) < 1e-9
+
+def test_trade_manager_caps_qty_to_liquidity():
+    books = MagicMock()
+    books.get_book.return_value = _book()
+    manager = TradeManager(MagicMock(), {"max_slippage_percent": Decimal("0.5")}, books)
+    qty = manager._cap_to_liquidity("BTCUSDT", FixedPoint.from_str("10", 3), "0.001")
+    # גבול 101.505: רמה ראשונה במלואה ועוד חלק מ-102
+    assert qty < FixedPoint.from_str("10", 3)
+    assert qty.to_decimal() == Decimal("2.020")
+
+class _FakeSocket:
+    def __init__(self, events, error=None):
+        self.events = list(events)
+        self.error = error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def recv(self):
+        await asyncio.sleep(0)
+        if self.events:
+            return self.events.pop(0)
+        if self.error:
+            raise self.error
+        await asyncio.sleep(3600)
+
+def _manager(client, socket):
+    with patch("bot.exchange.order_book.BinanceSocketManager") as bsm:
+        bsm.return_value.depth_socket.return_value = socket
+        manager = OrderBookManager(client)
+    return manager
+
+@pytest.mark.asyncio
+async def test_dead_stream_is_dropped_and_retracked():
+    client = AsyncMock()
+    client.get_order_book.return_value = {"lastUpdateId": 100, "asks": [["101", "1"]], "bids": []}
+    manager = _manager(client, _FakeSocket(
+        [{"e": "depthUpdate", "U": 101, "u": 101, "a": [], "b": []}] * 2, error=ConnectionError("closed")))
+
+    await manager.sync(["BTCUSDT"])
+    await asyncio.gather(manager._tasks["BTCUSDT"], return_exceptions=True)
+    # הספר הקפוא לא משמש לתמחור, וה-sync הבא פותח stream חדש
+    assert manager.get_book("BTCUSDT") is None
+    assert "BTCUSDT" not in manager._tasks
+
+    manager.bsm.depth_socket.return_value = _FakeSocket([])
+    await manager.sync(["BTCUSDT"])
+    assert not manager._tasks["BTCUSDT"].done()
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_snapshot_failures_back_off():
+    client = AsyncMock()
+    client.get_order_book.side_effect = Exception("429")
+    events = [{"e": "depthUpdate", "U": i, "u": i, "a": [], "b": []} for i in range(1, 200)]
+    manager = _manager(client, _FakeSocket(events))
+
+    manager.track("BTCUSDT")
+    for _ in range(100):
+        await asyncio.sleep(0)
+    # בקשת snapshot אחת בלבד נכשלה; הבאה ממתינה ל-backoff ולא נשלחת על כל עדכון
+    assert client.get_order_book.call_count == 1
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_dca_capped_to_zero_keeps_tp_order():
+    client = AsyncMock()
+    client.get_symbol_info.return_value = {"filters": [
+        {"filterType": "LOT_SIZE", "stepSize": "0.001"}, {"filterType": "PRICE_FILTER", "tickSize": "0.01"}]}
+    books = MagicMock()
+    empty = OrderBook("BTCUSDT")
+    empty.load_snapshot({"lastUpdateId": 1, "asks": [], "bids": []})
+    books.get_book.return_value = empty
+    manager = TradeManager(client, {"dry_run": False, "dca_scales": [Decimal("1")],
+                                    "max_slippage_percent": Decimal("0.5")}, books)
+    trade = {"id": 1, "symbol": "BTCUSDT", "tp_order_id": "123", "dca_count": 0,
+             "base_qty": FixedPoint.from_str("1", 3), "avg_price": FixedPoint.from_str("100", 2)}
+
+    assert await manager.execute_dca_buy(trade) is False
+    client.cancel_order.assert_not_called()
+    client.order_market_buy.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_wait_for_book_tracks_and_waits_for_snapshot():
+    client = AsyncMock()
+    client.get_order_book.return_value = {"lastUpdateId": 100, "asks": [["101", "1"]], "bids": []}
+    manager = _manager(client, _FakeSocket(
+        [{"e": "depthUpdate", "U": i, "u": i, "a": [], "b": []} for i in (101, 102)]))
+
+    # מועמד חדש שאין לו עדיין stream - נפתח ומחכים ל-snapshot
+    book = await manager.wait_for_book("BTCUSDT", timeout=1.0)
+    assert book is not None and book.best_ask() == 101.0
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_wait_for_book_times_out_without_snapshot():
+    client = AsyncMock()
+    client.get_order_book.side_effect = Exception("429")
+    manager = _manager(client, _FakeSocket([{"e": "depthUpdate", "U": 1, "u": 1, "a": [], "b": []}]))
+
+    assert await manager.wait_for_book("BTCUSDT", timeout=0.1) is None
+    await manager.stop()
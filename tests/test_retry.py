@@ -0,0 +1,132 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+from binance.exceptions import BinanceAPIException
+import bot.utils.retry as retry_module
+from bot.utils.retry import retry, CircuitOpenError, breaker_states
+
+@pytest.fixture(autouse=True)
+def reset_rate_limit():
+    yield
+    retry_module._rate_limited_until["value"] = 0.0
+
+def _api_error(code, status=400, headers=None):
+    response = SimpleNamespace(headers=headers or {}, text="")
+    return BinanceAPIException(response, status, json.dumps({"code": code, "msg": "err"}))
+
+@pytest.mark.asyncio
+async def test_raises_after_retries_instead_of_none():
+    calls = []
+
+    @retry(max_retries=3, name="test_raise")
+    async def flaky():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        with pytest.raises(ConnectionError):
+            await flaky()
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_fails_fast():
+    calls = []
+
+    @retry(max_retries=1, name="test_breaker", failure_threshold=2, reset_timeout=60)
+    async def down():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await down()
+    with pytest.raises(CircuitOpenError):
+        await down()
+    assert len(calls) == 2
+    assert breaker_states()["endpoints"]["test_breaker"]["state"] == "open"
+
+@pytest.mark.asyncio
+async def test_rate_limit_uses_retry_after():
+    @retry(max_retries=3, name="test_rate_limit")
+    async def limited():
+        raise _api_error(-1003, status=429, headers={"Retry-After": "30"})
+
+    other = AsyncMock(return_value="ok")
+    other_endpoint = retry(name="test_rate_limit_other")(other)
+
+    with pytest.raises(BinanceAPIException):
+        await limited()
+    # המגבלה היא לכל ה-IP - גם endpoint אחר לא שולח בקשות עד Retry-After
+    with pytest.raises(CircuitOpenError) as exc:
+        await other_endpoint()
+    assert exc.value.retry_in > 25
+    assert other.await_count == 0
+    assert breaker_states()["rate_limited_for"] > 25
+
+@pytest.mark.asyncio
+async def test_logic_errors_are_not_retried():
+    calls = []
+
+    @retry(max_retries=3, name="test_logic")
+    async def bad_request():
+        calls.append(1)
+        raise _api_error(-1121)
+
+    with pytest.raises(BinanceAPIException):
+        await bad_request()
+    assert len(calls) == 1
+    assert breaker_states()["endpoints"]["test_logic"]["state"] == "closed"
+
+@pytest.mark.asyncio
+async def test_hedged_read_returns_first_success():
+    delays = [1.0, 0.0]
+
+    @retry(name="test_hedge", hedge_after=0.05)
+    async def slow_read():
+        await asyncio.sleep(delays.pop(0))
+        return "ok"
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await slow_read() == "ok"
+    assert loop.time() - start < 0.5
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_probe_allows_next_probe():
+    outcome = {"fail": True}
+
+    @retry(max_retries=1, name="test_cancel_probe", failure_threshold=1, reset_timeout=0.0)
+    async def endpoint():
+        if outcome["fail"]:
+            raise ConnectionError("down")
+        await asyncio.sleep(3600)
+
+    with pytest.raises(ConnectionError):
+        await endpoint()
+    # ה-breaker פתוח עם reset_timeout=0 - הקריאה הבאה היא probe, ואותה מבטלים
+    outcome["fail"] = False
+    probe = asyncio.ensure_future(endpoint())
+    await asyncio.sleep(0)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    endpoint_ok = retry(name="test_cancel_probe")(AsyncMock(return_value="ok"))
+    assert await endpoint_ok() == "ok"
+    assert breaker_states()["endpoints"]["test_cancel_probe"]["state"] == "closed"
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_weight_is_high(monkeypatch):
+    calls = []
+
+    @retry(name="test_hedge_weight", hedge_after=0.01)
+    async def slow_read():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    monkeypatch.setitem(retry_module._used_weight, "value", retry_module.HEDGE_MAX_WEIGHT)
+    assert await slow_read() == "ok"
+    assert len(calls) == 1
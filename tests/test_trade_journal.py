@@ -0,0 +1,69 @@
+import asyncio
+import aiosqlite
+import pytest
+from decimal import Decimal
+from bot.database import database_service
+from bot.database.database_service import create_tables, TradeRepository
+from bot.database.trade_journal import (TradeJournal, TradeAnalytics, fill_from_order,
+                                        EVENT_OPEN, EVENT_DCA, EVENT_CLOSE)
+from bot.utils.fixed_point import FixedPoint
+
+def fp(value, decimals):
+    return FixedPoint.from_str(value, decimals)
+
+def test_fill_from_order_weighted_price_and_fee():
+    order = {"fills": [
+        {"price": "100", "qty": "1", "commission": "0.1", "commissionAsset": "USDT"},
+        {"price": "103", "qty": "2", "commission": "0.2", "commissionAsset": "USDT"},
+    ]}
+    price, qty, fee, asset = fill_from_order(order, fp("99", 4), fp("3", 3))
+    assert price.to_decimal() == Decimal("102")
+    assert qty.to_decimal() == Decimal("3")
+    assert fee.to_decimal() == Decimal("0.3")
+    assert asset == "USDT"
+
+@pytest.mark.asyncio
+async def test_journal_and_analytics(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_service, "DATABASE_FILE", str(tmp_path / "trades.db"))
+    await create_tables()
+    journal = TradeJournal(batch_size=2)
+    journal.start()
+
+    # עסקה 1: קנייה ב-100 (עמלה 0.1), DCA ב-90, סגירה ב-100 -> רווח 10 פחות עמלה = 9.9
+    journal.record(1, "AAAUSDT", EVENT_OPEN, fp("100", 2), fp("1", 2), fp("0.1", 8), "USDT", ts=1000)
+    journal.record(1, "AAAUSDT", EVENT_DCA, fp("90", 2), fp("1", 2), ts=2000)
+    journal.record(1, "AAAUSDT", EVENT_CLOSE, fp("100", 2), fp("2", 2), ts=4000)
+    # עסקה 2 עדיין פתוחה - לא נכללת ב-PnL
+    journal.record(2, "BBBUSDT", EVENT_OPEN, fp("5", 2), fp("10", 2), ts=1000)
+    # עסקה 3 נפתחה לפני שהיומן היה קיים - רק CLOSE, בלי עלות קנייה
+    journal.record(3, "CCCUSDT", EVENT_CLOSE, fp("50", 2), fp("1", 2), ts=4000)
+    await journal.stop()
+
+    pnl = await TradeAnalytics.symbol_pnl()
+    assert len(pnl) == 1
+    assert pnl[0]["symbol"] == "AAAUSDT"
+    assert pnl[0]["pnl"] == Decimal("9.9")
+
+    holding = await TradeAnalytics.holding_times()
+    assert holding[0]["symbol"] == "AAAUSDT"
+    assert holding[0]["avg_seconds"] == 3000.0
+
+    trade_id = await TradeRepository.create_pending_trade("BBBUSDT")
+    await TradeRepository.confirm_trade(trade_id, fp("5", 2), fp("10", 2), "TP", dca_count=1)
+    assert await TradeAnalytics.dca_depth_stats() == [{"status": "OPEN", "dca_count": 1, "trades": 1}]
+
+@pytest.mark.asyncio
+async def test_stop_keeps_in_flight_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_service, "DATABASE_FILE", str(tmp_path / "trades.db"))
+    await create_tables()
+    journal = TradeJournal(batch_size=50)
+    journal.start()
+    for i in range(500):
+        journal.record(i, "AAAUSDT", EVENT_OPEN, fp("1", 2), fp("1", 2), ts=1000)
+    # עצירה בזמן שה-writer באמצע אצווה - אף אירוע לא הולך לאיבוד
+    await asyncio.sleep(0.005)
+    await journal.stop()
+
+    async with aiosqlite.connect(database_service.DATABASE_FILE) as db:
+        async with db.execute("SELECT COUNT(*) FROM trade_events") as cursor:
+            assert (await cursor.fetchone())[0] == 500